@@ -12,6 +12,7 @@ import QuartzCore
 /// - Motion:
 ///     • sends `{ "type":"gesture", "kind":"tilt_angles", "roll_deg":D, "pitch_deg":D, "dt":D }` at ~60 Hz
 ///       (roll: right-tilt positive; pitch: forward-tilt positive → cursor down)
+///       plus raw `gyro_dps:[x,y,z]` (deg/s) and `accel_g:[x,y,z]` (g, device frame) for server-side fusion
 ///     • sends `{ "type":"gesture", "kind":"tap" }` on phone knock
 /// - Voice (unchanged): streams `{ "type":"command", "text":"..." }`
 final class MotionSpeechStreamer: NSObject, ObservableObject {
@@ -134,9 +135,9 @@ final class MotionSpeechStreamer: NSObject, ObservableObject {
     func sendJSON(_ dict: [String: Any]) {
         guard let ws = webSocket else { return }
         do {
+            // binary frame: the server parses the bytes directly, no String round-trip either side
             let data = try JSONSerialization.data(withJSONObject: dict, options: [])
-            guard let text = String(data: data, encoding: .utf8) else { return }
-            ws.send(.string(text)) { err in
+            ws.send(.data(data)) { err in
                 if let err {
                     print("❌ ws send error:", err.localizedDescription)
                     self.connectionStatus = "send error: \(err.localizedDescription)"
@@ -305,12 +306,18 @@ final class MotionSpeechStreamer: NSObject, ObservableObject {
         // CoreMotion pitch is positive when top edge rises in some orientations, so invert:
         let pitchDeg = -(pitchRad * toDeg)
 
+        // Raw sensors so the server can Kalman-fuse gyro (short-term) with accel (drift-free)
+        let w = dm.rotationRate
+        let g = dm.gravity, ua = dm.userAcceleration
+
         sendJSON([
             "type": "gesture",
             "kind": "tilt_angles",
             "roll_deg": rollDeg,
             "pitch_deg": pitchDeg,
-            "dt": dt
+            "dt": dt,
+            "gyro_dps": [w.x * toDeg, w.y * toDeg, w.z * toDeg],
+            "accel_g": [g.x + ua.x, g.y + ua.y, g.z + ua.z]
         ])
 
         // Tap detection via acceleration spike (unchanged)
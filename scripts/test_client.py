@@ -1,7 +1,8 @@
-import asyncio, websockets, json
+import asyncio, websockets, orjson
 
 async def main():
     ws = await websockets.connect("ws://127.0.0.1:8765")
+    await ws.recv(decode=False)  # server hello
     tests = [
         "open gmail",
         "type hello judges this is handsfree office",
@@ -12,8 +13,10 @@ async def main():
         "scroll down"
     ]
     for t in tests:
-        await ws.send(json.dumps({"type":"command","text":t}))
-        print(t, "→", await ws.recv())
+        await ws.send(orjson.dumps({"type":"command","text":t}))
+        # replies are newline-delimited; one frame can carry several
+        for line in (await ws.recv(decode=False)).splitlines():
+            print(t, "→", orjson.loads(line))
     await ws.close()
 
 asyncio.run(main())
\ No newline at end of file
@@ -1,6 +1,8 @@
-import asyncio, websockets
+import asyncio, websockets, orjson
 async def main():
     async with websockets.connect("ws://localhost:8765") as ws:
         while True:
-            print(await ws.recv())
+            # replies may be batched: one JSON object per line
+            for line in (await ws.recv(decode=False)).splitlines():
+                print(orjson.loads(line))
 asyncio.run(main())
\ No newline at end of file
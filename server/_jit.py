@@ -0,0 +1,10 @@
+# server/_jit.py
+# numba's njit when installed, else a no-op decorator (no other dependencies)
+try:
+    from numba import njit
+except Exception:
+    def njit(*args, **kwargs):
+        # numba not installed: kernels run as plain NumPy/Python
+        if args and callable(args[0]):
+            return args[0]
+        return lambda f: f
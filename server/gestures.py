@@ -1,7 +1,11 @@
+import os
 import time
-import math
 import threading
-from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from _jit import njit
 
 try:
     import cv2
@@ -10,42 +14,118 @@ except Exception as e:
     cv2 = None
     mp = None
 
-def _v(ax, ay, bx, by):
-    return (ax - bx, ay - by)
-
-def _angle_deg(ax, ay, bx, by, cx, cy):
-    # angle ABC in degrees
-    v1x, v1y = _v(ax, ay, bx, by)   # BA
-    v2x, v2y = _v(cx, cy, bx, by)   # BC
-    dot = v1x*v2x + v1y*v2y
-    n1 = (v1x*v1x + v1y*v1y) ** 0.5
-    n2 = (v2x*v2x + v2y*v2y) ** 0.5
-    if n1 == 0 or n2 == 0:
-        return 0.0
-    c = max(-1.0, min(1.0, dot/(n1*n2)))
-    return math.degrees(math.acos(c))
-
-def _is_extended(lm, tip, pip, mcp, thresh_deg=160.0):
-    # Finger extended if the PIP angle is "open" (near straight line)
-    t, p, m = lm[tip], lm[pip], lm[mcp]
-    ang = _angle_deg(t.x, t.y, p.x, p.y, m.x, m.y)
-    return ang >= thresh_deg
+try:
+    from mediapipe.tasks.python import BaseOptions
+    from mediapipe.tasks.python.vision import HandLandmarker, HandLandmarkerOptions, RunningMode
+except Exception:
+    HandLandmarker = None
+
+# Tasks API model bundles (download hand_landmarker.task from the MediaPipe model page;
+# the int8 variant is produced with the opencv_zoo quantization tools)
+_MODELS = Path(__file__).parent.parent / "models"
+HAND_MODEL_PATH = os.getenv("HAND_LANDMARKER_MODEL", str(_MODELS / "hand_landmarker.task"))
+HAND_MODEL_INT8_PATH = os.getenv("HAND_LANDMARKER_INT8_MODEL", str(_MODELS / "hand_landmarker_int8.task"))
+# Stored frame with a clearly visible hand, used to check int8 against fp32 at startup
+HAND_CALIBRATION_IMAGE = os.getenv("HAND_CALIBRATION_IMAGE", str(_MODELS / "hand_calibration.png"))
+INT8_MAX_LANDMARK_ERR = 0.02   # normalized image units; gestures only use coarse 2D x/y
+
+# landmark indices per finger: index, middle, ring, pinky, thumb
+_TIPS = np.array([8, 12, 16, 20, 4])
+_PIPS = np.array([6, 10, 14, 18, 3])
+_MCPS = np.array([5, 9, 13, 17, 2])
+
+# finger-extension bitmask: bit i set when finger i (in the order above) is extended
+IDX_ONLY  = 0b00001
+PKY_ONLY  = 0b01000
+FINGERS   = 0b01111   # the four non-thumb fingers
+FIVE_OPEN = 0b11111
+FIST      = 0
+
+SCROLL_FLUSH_S = 0.1   # scroll pulses are coalesced into one event per window
+
+# Centroid velocity filter responsiveness: roughly how long (s) a change in hand speed
+# takes to show up in the estimate. Lower = snappier but noisier.
+SETTLE_TIME_S = 0.1
+CENTROID_NOISE = 0.005  # landmark centroid jitter (std, normalized image units)
+
+# finger extended if the PIP angle (tip-pip-mcp) is >= 160°, i.e. its cosine is <= cos(160°)
+_COS_EXTENDED = float(np.cos(np.radians(160.0)))
+
+@njit(cache=True, fastmath=True)
+def _features(pts):
+    """(21, >=2) landmark buffer -> (cx, cy, finger flags, pinch distance)."""
+    xs = pts[:, 0]
+    ys = pts[:, 1]
+    # BA and BC vectors at each finger's PIP joint, all five fingers at once
+    v1x = xs[_TIPS] - xs[_PIPS]
+    v1y = ys[_TIPS] - ys[_PIPS]
+    v2x = xs[_MCPS] - xs[_PIPS]
+    v2y = ys[_MCPS] - ys[_PIPS]
+    cos = (v1x * v2x + v1y * v2y) / (np.sqrt((v1x * v1x + v1y * v1y) * (v2x * v2x + v2y * v2y)) + 1e-9)
+    flags = 0
+    for i in range(5):
+        if cos[i] <= _COS_EXTENDED:
+            flags |= 1 << i
+    pinch = np.sqrt((xs[4] - xs[8]) ** 2 + (ys[4] - ys[8]) ** 2)
+    return xs.mean(), ys.mean(), flags, pinch
+
+@njit(cache=True)
+def _kcv_step(s, z, dt, q, r):
+    # s = [pos, vel, P00, P01, P11]; constant-velocity predict, then fuse position z (in place)
+    x = s[0] + s[1] * dt
+    p00 = s[2] + dt * (2.0 * s[3] + dt * s[4]) + q * dt * dt * dt / 3.0
+    p01 = s[3] + dt * s[4] + q * dt * dt / 2.0
+    p11 = s[4] + q * dt
+    k0 = p00 / (p00 + r)
+    k1 = p01 / (p00 + r)
+    y = z - x
+    s[0] = x + k0 * y
+    s[1] = s[1] + k1 * y
+    s[2] = (1.0 - k0) * p00
+    s[3] = (1.0 - k0) * p01
+    s[4] = p11 - k1 * p01
+
+class KalmanCV:
+    """1D constant-velocity Kalman filter over a position stream; exposes the filtered velocity."""
+    def __init__(self, settle_time_s=SETTLE_TIME_S, meas_std=CENTROID_NOISE):
+        self.r = meas_std * meas_std
+        # white-noise-acceleration intensity whose steady-state time constant is ~settle_time_s
+        self.q = self.r / settle_time_s ** 4
+        self.s = np.zeros(5)
+        self.ready = False
+
+    def reset(self):
+        self.ready = False
+
+    def step(self, z, dt):
+        if not self.ready:
+            self.s[:] = (z, 0.0, self.r, 0.0, 0.25)
+            self.ready = True
+            return
+        _kcv_step(self.s, z, dt, self.q, self.r)
+
+    @property
+    def velocity(self):
+        return float(self.s[1])
 
 class CameraGestureEngine:
     """
     Simple, thread-based gesture recognizer using MediaPipe Hands.
-    Emits high-level actions via a callback: on_action(str).
+    Emits high-level actions via a callback: on_action(str) or, for scrolls,
+    on_action(str, amount) where amount is the number of frames the pose was held.
 
     Actions emitted:
       - "zoom_in", "zoom_out"
       - "history_back", "history_forward"
       - "next_tab", "prev_tab"
-      - "scroll_up", "scroll_down"   (continuous pulses while moving)
+      - "scroll_up", "scroll_down"   (one event per SCROLL_FLUSH_S while the pose is held)
       - "app_switcher_start", "app_switcher_next", "app_switcher_prev", "app_switcher_commit"
     """
-    def __init__(self, on_action, camera_index=0):
+    def __init__(self, on_action, camera_index=0, model_path=HAND_MODEL_PATH, int8_model_path=HAND_MODEL_INT8_PATH):
         self.on_action = on_action
         self.camera_index = camera_index
+        self.model_path = model_path
+        self.int8_model_path = int8_model_path
         self._thr = None
         self._stop = threading.Event()
         self._started = False
@@ -55,11 +135,30 @@ class CameraGestureEngine:
         self._last_emit = {}
         self._mode_appswitch = False
 
-        # velocity smoothing
-        self._centroid_hist = deque(maxlen=5)
+        # landmark buffer (21 x [x, y, z]) reused every frame
+        self._pts = np.zeros((21, 3), dtype=np.float32)
+
+        # centroid velocity (Kalman-filtered per axis)
+        self._kx = KalmanCV()
+        self._ky = KalmanCV()
         self._last_t = None
         self._open_hand_start_t = None      # for app-switcher 3s hold
-        self._state_hist = deque(maxlen=6)  # temporal smoothing (last 6 frames)
+        # temporal smoothing (last 6 frames); ring buffer indexed by _state_idx % 6
+        self._state = np.zeros(6, dtype=[("four_ext", "i1"), ("is_fist", "?"), ("cy", "f4"), ("vx", "f4"), ("vy", "f4")])
+        self._state_idx = 0
+
+        # frame pacing: grab every camera frame, decode only ~30 fps of them
+        self._target_dt = 1.0 / 30.0
+        self._last_retrieve = 0.0
+
+        # single-slot (frame, capture time) handoff from the capture thread; newest frame wins
+        self._latest = None
+        self._latest_lock = threading.Lock()
+        self._frame_ready = threading.Event()
+
+        # scroll coalescing: +1 per scroll-up frame, -1 per scroll-down frame
+        self._scroll_accum = 0
+        self._scroll_flush_t = 0.0
 
     def start(self):
         if self._started:
@@ -73,13 +172,16 @@ class CameraGestureEngine:
         self._stop.set()
         self._started = False
 
-    def _emit(self, action, cooldown=0.25):
+    def _emit(self, action, cooldown=0.25, amount=None):
         now = time.monotonic()
         last = self._last_emit.get(action, 0.0)
         if now - last >= cooldown:
             self._last_emit[action] = now
             try:
-                self.on_action(action)
+                if amount is None:
+                    self.on_action(action)
+                else:
+                    self.on_action(action, amount)
             except Exception:
                 pass
 
@@ -87,182 +189,287 @@ class CameraGestureEngine:
         # heuristic: finger extended if tip is farther from wrist than pip/mcp along y-axis in image space
         return lm[tip].y < lm[pip].y < lm[mcp].y
 
-    def _classify(self, lm):
-        # basic centroid
-        cx = sum([p.x for p in lm]) / len(lm)
-        cy = sum([p.y for p in lm]) / len(lm)
+    def _load_lm(self, lm):
+        # copy MediaPipe landmarks into the preallocated buffer (no per-frame allocation)
+        b = self._pts
+        for i, p in enumerate(lm):
+            b[i] = (p.x, p.y, p.z)
+        return b
 
-        # robust finger extension (ignore thumb for 4-finger gestures)
-        ext_idx  = _is_extended(lm, tip=8,  pip=6,  mcp=5)
-        ext_mid  = _is_extended(lm, tip=12, pip=10, mcp=9)
-        ext_ring = _is_extended(lm, tip=16, pip=14, mcp=13)
-        ext_pky  = _is_extended(lm, tip=20, pip=18, mcp=17)
-        ext_thumb = _is_extended(lm, tip=4, pip=3, mcp=2, thresh_deg=160.0)
+    def _classify(self, pts):
+        # centroid, robust finger extension (ignore thumb for 4-finger gestures), pinch
+        cx, cy, flags, pinch_d = _features(pts)
+        flags = int(flags)
 
-        four_ext = int(ext_idx) + int(ext_mid) + int(ext_ring) + int(ext_pky) + int(ext_thumb)
+        four_ext = bin(flags).count("1")
 
         # Fist: all four non-thumb fingers curled
-        is_fist = (four_ext == 0)
+        is_fist = (flags == FIST)
 
-        # Pinch distance still available if you need it for other gestures
-        def dist(a, b):
-            dx = lm[a].x - lm[b].x
-            dy = lm[a].y - lm[b].y
-            return math.hypot(dx, dy)
-        pinch_d = dist(4, 8)
+        # Pinch distance (pinch_d) still available if you need it for other gestures
 
         return {
-            "cx": cx, "cy": cy,
-            "ext_idx": ext_idx, "ext_mid": ext_mid, "ext_ring": ext_ring, "ext_pky": ext_pky,
+            "cx": float(cx), "cy": float(cy),
+            "flags": flags,
             "four_ext": four_ext,
             "is_fist": is_fist,
-            "pinch": pinch_d
+            "pinch": float(pinch_d)
         }
 
+    def _process(self, lm, t):
+        """Run the gesture decisions for one frame; lm is None when no hand was detected."""
+        if lm is not None:
+            pts = self._load_lm(lm)
+            feats = self._classify(pts)
+            four_ext = feats["four_ext"]   # number of extended non-thumb fingers (0–5)
+            is_fist  = feats["is_fist"]    # True if all 5 fingers curled
+
+            # velocity from centroid
+            if self._last_t is None:
+                self._last_t = t
+                self._kx.reset(); self._ky.reset()
+                self._kx.step(feats["cx"], 0.0); self._ky.step(feats["cy"], 0.0)
+                return
+            dt = max(1e-3, t - self._last_t)
+            self._last_t = t
+            self._kx.step(feats["cx"], dt); self._ky.step(feats["cy"], dt)
+            vx, vy = self._kx.velocity, self._ky.velocity
+
+            # gestures
+            pinch = feats["pinch"]
+
+            # Record state for smoothing
+            k = len(self._state)
+            i = self._state_idx
+            self._state[i % k] = (four_ext, is_fist, feats["cy"], vx, vy)
+            i = self._state_idx = i + 1
+
+            # Smooth velocities (last two samples) for direction
+            vy_sm = 0.0
+            if i >= 2:
+                vy_sm = float(self._state["vy"][[(i - 1) % k, (i - 2) % k]].mean())
+
+            # ======= SCROLL: single-finger pose =======
+            # index-only => scroll up; pinky-only => scroll down
+            fingers = feats["flags"] & FINGERS   # thumb is not part of the scroll poses
+            idx_only  = fingers == IDX_ONLY
+            pky_only  = fingers == PKY_ONLY
+
+            if idx_only:
+                # pointer up -> scroll up
+                self._scroll_accum += 1
+            elif pky_only:
+                # pinky up -> scroll down
+                self._scroll_accum -= 1
+            # one scroll event per window instead of one per frame
+            if self._scroll_accum and t - self._scroll_flush_t >= SCROLL_FLUSH_S:
+                n = self._scroll_accum
+                self._emit("scroll_up" if n > 0 else "scroll_down", cooldown=0.0, amount=abs(n))
+                self._scroll_accum = 0
+                self._scroll_flush_t = t
+
+            # ======= ZOOM: 3-4-fingers up/down by motion =======
+            # Require clear 3-4-finger pose AND vertical motion to avoid accidental triggers.
+            if (four_ext >= 3 and four_ext <= 4) and abs(vy_sm) > 0.9 and abs(vy_sm) > abs(vx)*1.2:
+                if vy_sm < 0:
+                    self._emit("zoom_in", cooldown=0.5)   # 4-fingers move up
+                else:
+                    self._emit("zoom_out", cooldown=0.5)  # 4-fingers move down
+
+            # history by horizontal swipes with open hand (>=3 fingers)
+            if feats["flags"] == FIVE_OPEN and abs(vx) > 1.2 and abs(vx) > abs(vy)*1.3:
+                if vx > 0:
+                    self._emit("history_forward")
+                else:
+                    self._emit("history_back")
+
+            # tab switching with two fingers extended
+            if four_ext == 2 and abs(vx) > 1.0 and abs(vx) > abs(vy)*1.2:
+                if vx > 0:
+                    self._emit("next_tab")
+                else:
+                    self._emit("prev_tab")
+
+            # app switcher: require a steady open hand (≥3 fingers) for 3s to start
+            if not self._mode_appswitch:
+                if feats["flags"] == FIVE_OPEN and (abs(vx) + abs(vy) < 0.3):
+                    if self._open_hand_start_t is None:
+                        # start timing the hold
+                        self._open_hand_start_t = t
+                    elif t - self._open_hand_start_t >= 2.0:
+                        # held steady for 3s → enter app switcher
+                        self._emit("app_switcher_start")
+                        self._mode_appswitch = True
+                        self._mode_started_t = t
+                        self._open_hand_start_t = None  # reset timer
+                else:
+                    # not a steady open hand → reset timer
+                    self._open_hand_start_t = None  
+
+            elif self._mode_appswitch:
+                # navigate by horizontal motion         
+                if abs(vx) > 1.0 and abs(vx) > abs(vy):
+                    if vx > 0:
+                        self._emit("app_switcher_next")
+                    else:
+                        self._emit("app_switcher_prev")
+
+                # commit when fist (0 fingers)
+                if is_fist:
+                    self._emit("app_switcher_commit")
+                    self._mode_appswitch = False
+                    self._open_hand_start_t = None  # safety reset
+        else:
+            self._last_t = None
+            self._scroll_accum = 0
+            self._last_pinch_d = None
+
+    @staticmethod
+    def _detect_once(model_path, image):
+        # single IMAGE-mode inference; returns the (21, 3) landmarks or None
+        opts = HandLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=model_path),
+            running_mode=RunningMode.IMAGE,
+            num_hands=1,
+        )
+        with HandLandmarker.create_from_options(opts) as landmarker:
+            res = landmarker.detect(image)
+        if not res.hand_landmarks:
+            return None
+        return np.array([(p.x, p.y, p.z) for p in res.hand_landmarks[0]], dtype=np.float32)
+
+    def _pick_model_path(self):
+        """
+        Prefer the int8 model when it is present. If the fp32 model and a calibration frame are
+        also available, keep int8 only if both models agree on that frame (2D landmarks within
+        INT8_MAX_LANDMARK_ERR and identical finger-extension flags); otherwise use fp32.
+        """
+        if not (self.int8_model_path and os.path.exists(self.int8_model_path)):
+            return self.model_path
+        if not (os.path.exists(self.model_path) and os.path.exists(HAND_CALIBRATION_IMAGE)):
+            return self.int8_model_path
+        try:
+            image = mp.Image.create_from_file(HAND_CALIBRATION_IMAGE)
+            ref = self._detect_once(self.model_path, image)
+            q = self._detect_once(self.int8_model_path, image)
+        except Exception as e:
+            print("int8 calibration error:", e)
+            return self.model_path
+        if ref is None or q is None:
+            print("int8 calibration: no hand found, using fp32 model")
+            return self.model_path
+        err = float(np.abs(ref[:, :2] - q[:, :2]).max())
+        if err > INT8_MAX_LANDMARK_ERR or _features(ref)[2] != _features(q)[2]:
+            print(f"int8 calibration failed (max err {err:.3f}), using fp32 model")
+            return self.model_path
+        return self.int8_model_path
+
+    def _open_landmarker(self):
+        """
+        Build a LIVE_STREAM HandLandmarker (GPU delegate, falling back to CPU).
+        Returns None if the Tasks API or the model file is unavailable.
+        """
+        if HandLandmarker is None:
+            return None
+        model_path = self._pick_model_path()
+        if not os.path.exists(model_path):
+            return None
+        for delegate in (BaseOptions.Delegate.GPU, BaseOptions.Delegate.CPU):
+            try:
+                opts = HandLandmarkerOptions(
+                    base_options=BaseOptions(model_asset_path=model_path, delegate=delegate),
+                    running_mode=RunningMode.LIVE_STREAM,
+                    num_hands=1,
+                    min_hand_detection_confidence=0.5,
+                    min_tracking_confidence=0.5,
+                    result_callback=self._on_result,
+                )
+                return HandLandmarker.create_from_options(opts)
+            except Exception as e:
+                print("HandLandmarker init failed:", delegate, e)
+        return None
+
+    def _on_result(self, result, _image, timestamp_ms):
+        # LIVE_STREAM callback (MediaPipe thread); timestamps are frame capture times (time.monotonic())
+        lm = result.hand_landmarks[0] if result.hand_landmarks else None
+        self._process(lm, timestamp_ms / 1000.0)
+
+    def _capture(self, cap, done):
+        """Producer: decode ~30 fps of the camera stream into the single-slot buffer."""
+        while not (self._stop.is_set() or done.is_set()):
+            # grab() only dequeues the frame; skip the decode until the next one is due
+            if not cap.grab():
+                time.sleep(0.02)
+                continue
+            if time.monotonic() - self._last_retrieve < self._target_dt:
+                continue
+            ok, frame = cap.retrieve()
+            if not ok:
+                continue
+            self._last_retrieve = t = time.monotonic()
+            with self._latest_lock:
+                self._latest = (frame, t)   # overwrites a frame inference never got to
+            self._frame_ready.set()
+
     def _run(self):
         if cv2 is None or mp is None:
             # cannot run - missing deps
             return
         # cap = cv2.VideoCapture(self.camera_index)
         cap = cv2.VideoCapture(0)
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         cap.set(cv2.CAP_PROP_FPS, 60)
-        hands = mp.solutions.hands.Hands(model_complexity=0, max_num_hands=1, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        # compile the numba kernels (no-op without numba) before the first frame arrives
+        _features(self._pts)
+        _kcv_step(np.zeros(5), 0.0, self._target_dt, 1.0, 1.0)
+        landmarker = self._open_landmarker()
+        hands = None
+        if landmarker is None:
+            # legacy solution API (CPU) when the Tasks model is not available
+            hands = mp.solutions.hands.Hands(model_complexity=0, max_num_hands=1, min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        last_ts = 0
+        # capture runs on its own thread so a slow inference never backs up the camera queue
+        cap_done = threading.Event()  # this run's capture thread only; _stop may be cleared by a restart
+        cap_thr = threading.Thread(target=self._capture, args=(cap, cap_done), daemon=True)
+        cap_thr.start()
         try:
             while not self._stop.is_set():
-                ok, frame = cap.read()
-                if not ok:
-                    time.sleep(0.02)
+                if not self._frame_ready.wait(0.1):
+                    continue
+                self._frame_ready.clear()
+                with self._latest_lock:
+                    latest, self._latest = self._latest, None
+                if latest is None:
                     continue
+                frame, t = latest
+                # landmark model input is 224x224; shrink before flip/cvtColor so they touch fewer pixels
+                frame = cv2.resize(frame, (320, 240), interpolation=cv2.INTER_AREA)
                 frame = cv2.flip(frame, 1)
                 rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                res = hands.process(rgb)
-                t = time.monotonic()
-
-                if res.multi_hand_landmarks:
-                    lm = res.multi_hand_landmarks[0].landmark
-                    feats = self._classify(lm)
-                    four_ext = feats["four_ext"]   # number of extended non-thumb fingers (0–5)
-                    is_fist  = feats["is_fist"]    # True if all 5 fingers curled
-
-                    # velocity from centroid
-                    if self._last_t is None:
-                        self._last_t = t
-                        self._centroid_hist.clear()
-                        self._centroid_hist.append((feats["cx"], feats["cy"], t))
-                        continue
-                    self._centroid_hist.append((feats["cx"], feats["cy"], t))
-                    vx, vy = 0.0, 0.0
-                    if len(self._centroid_hist) >= 2:
-                        x0, y0, t0 = self._centroid_hist[0]
-                        x1, y1, t1 = self._centroid_hist[-1]
-                        dt = max(1e-3, t1 - t0)
-                        vx = (x1 - x0) / dt
-                        vy = (y1 - y0) / dt
-
-                    # gestures
-                    pinch = feats["pinch"]
-
-                    # Record state for smoothing
-                    self._state_hist.append({
-                        "four_ext": feats["four_ext"],
-                        "is_fist": feats["is_fist"],
-                        "cy": feats["cy"],
-                        "vx": vx,
-                        "vy": vy,
-                    })
-
-                    # Majority vote over last K frames
-                    def _maj(field, pred):
-                        return sum(1 for s in self._state_hist if pred(s[field])) > len(self._state_hist)//2
-
-                    four_open_now = _maj("four_ext", lambda n: n == 4)    # four fingers clearly extended
-                    fist_now      = _maj("is_fist", lambda b: b is True)
-
-                    # Smooth velocities (last two samples) for direction
-                    vy_sm = 0.0
-                    if len(self._state_hist) >= 2:
-                        vy_sm = sum(s["vy"] for s in list(self._state_hist)[-2:]) / 2.0
-
-                    # ======= SCROLL: single-finger pose =======
-                    # index-only => scroll up; pinky-only => scroll down
-                    idx_only  = feats.get("ext_idx")  and not feats.get("ext_mid") and not feats.get("ext_ring") and not feats.get("ext_pky") and not feats.get("ext_thumb", False)
-                    pky_only  = feats.get("ext_pky")  and not feats.get("ext_idx") and not feats.get("ext_mid")  and not feats.get("ext_ring") and not feats.get("ext_thumb", False)
-
-                    # Add a tiny motion/deadzone guard so random jitter doesn't scroll
-                    # Use smoothed vertical velocity if you already compute it (vy_sm), else fallback to vy
-                    vy_used = vy_sm if 'vy_sm' in locals() else vy
-
-                    if idx_only:
-                        # pointer up -> scroll up (gentle, frequent ticks)
-                        self._emit("scroll_up", cooldown=0.01)
-                    elif pky_only:
-                        # pinky up -> scroll down
-                        self._emit("scroll_down", cooldown=0.01)
-
-                    # ======= ZOOM: 3-4-fingers up/down by motion =======
-                    # Require clear 3-4-finger pose AND vertical motion to avoid accidental triggers.
-                    if (four_ext >= 3 and four_ext <= 4) and abs(vy_sm) > 0.9 and abs(vy_sm) > abs(vx)*1.2:
-                        if vy_sm < 0:
-                            self._emit("zoom_in", cooldown=0.5)   # 4-fingers move up
-                        else:
-                            self._emit("zoom_out", cooldown=0.5)  # 4-fingers move down
-
-                    # history by horizontal swipes with open hand (>=3 fingers)
-                    if four_ext == 5 and abs(vx) > 1.2 and abs(vx) > abs(vy)*1.3:
-                        if vx > 0:
-                            self._emit("history_forward")
-                        else:
-                            self._emit("history_back")
-
-                    # tab switching with two fingers extended
-                    if four_ext == 2 and abs(vx) > 1.0 and abs(vx) > abs(vy)*1.2:
-                        if vx > 0:
-                            self._emit("next_tab")
-                        else:
-                            self._emit("prev_tab")
-
-                    # app switcher: require a steady open hand (≥3 fingers) for 3s to start
-                    if not self._mode_appswitch:
-                        if four_ext >= 5 and (abs(vx) + abs(vy) < 0.3):
-                            if self._open_hand_start_t is None:
-                                # start timing the hold
-                                self._open_hand_start_t = t
-                            elif t - self._open_hand_start_t >= 2.0:
-                                # held steady for 3s → enter app switcher
-                                self._emit("app_switcher_start")
-                                self._mode_appswitch = True
-                                self._mode_started_t = t
-                                self._open_hand_start_t = None  # reset timer
-                        else:
-                            # not a steady open hand → reset timer
-                            self._open_hand_start_t = None  
-
-                    elif self._mode_appswitch:
-                        # navigate by horizontal motion         
-                        if abs(vx) > 1.0 and abs(vx) > abs(vy):
-                            if vx > 0:
-                                self._emit("app_switcher_next")
-                            else:
-                                self._emit("app_switcher_prev")
-
-                        # commit when fist (0 fingers)
-                        if is_fist:
-                            self._emit("app_switcher_commit")
-                            self._mode_appswitch = False
-                            self._open_hand_start_t = None  # safety reset
-                else:
-                    self._last_t = None
-                    self._centroid_hist.clear()
-                    self._last_pinch_d = None
 
-                # run ~30 fps without UI
-                time.sleep(0.001)
+                if landmarker is not None:
+                    # async inference; decisions run in _on_result. Timestamps must strictly increase.
+                    ts = max(int(t * 1000), last_ts + 1)
+                    last_ts = ts
+                    landmarker.detect_async(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb), ts)
+                    continue
+
+                res = hands.process(rgb)
+                lm = res.multi_hand_landmarks[0].landmark if res.multi_hand_landmarks else None
+                self._process(lm, t)
         finally:
+            # release only once the capture thread is out of grab()/retrieve()
+            cap_done.set()
+            cap_thr.join()
             try:
                 cap.release()
             except Exception:
                 pass
-            try:
-                hands.close()
-            except Exception:
-                pass
\ No newline at end of file
+            for model in (landmarker, hands):
+                try:
+                    if model is not None:
+                        model.close()
+                except Exception:
+                    pass
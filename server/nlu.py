@@ -1,29 +1,41 @@
 # server/nlu.py
 import string
-import os, re, json, httpx
+import os, re, json, asyncio
+import orjson
 from pathlib import Path
+from functools import lru_cache
 from tenacity import retry, stop_after_attempt, wait_exponential
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from typing import Optional
 
+try:
+    import hyperscan  # optional regex prefilter (requirements.txt; not available on Windows)
+except Exception:
+    hyperscan = None
+
 BASE = Path(__file__).parent.parent
 CONFIG = BASE / "config"
 
-def load_json(path): return json.load(open(path, "r", encoding="utf-8"))
+def load_json(path): return orjson.loads(Path(path).read_bytes())
 
 INTENTS = load_json(CONFIG/"intents.json")
 KEYMAP  = load_json(CONFIG/"keymap.json")
+for _name, _plan in KEYMAP.items():
+    _plan.setdefault("intent", _name)  # plans carry their intent; no per-command copy
 SLOTS   = load_json(CONFIG/"slots.json")
-SYSTEM_PROMPT_TMPL = open(CONFIG/"system_prompt.txt", "r", encoding="utf-8").read()
+SYSTEM_PROMPT_TMPL = (CONFIG/"system_prompt.txt").read_text(encoding="utf-8")
 
 # Allow actions defined in keymap plus a few server-handled meta actions
 ALLOWED_ACTIONS = set(KEYMAP.keys()) | {"set_browser", "compose_email"}
+_ACTIONS_LIST_STR = "\n".join(f"- {name}" for name in sorted(ALLOWED_ACTIONS))
 
+# slot / route resolution is a pure function of the text; users repeat the same commands
+@lru_cache(maxsize=512)
 def slot_app(name: str) -> str:
     n = (name or "").lower().strip()
     return SLOTS.get("apps", {}).get(n, name)
 
+@lru_cache(maxsize=512)
 def slot_site(token: str) -> str:
     t = (token or "").lower().strip()
     site_map = SLOTS.get("sites", {})
@@ -33,13 +45,26 @@ def slot_site(token: str) -> str:
         return "https://" + t
     return t
 
+CHROME_FAMILY = {
+    "Google Chrome",
+    "Brave Browser",
+    "Microsoft Edge",
+    "Vivaldi",
+}
+
+# lowercase spoken/typed name → canonical app name
+BROWSER_ALIASES = {
+    **{b.lower(): b for b in CHROME_FAMILY},
+    "chrome": "Google Chrome",
+    "chromium": "Google Chrome",
+    "brave": "Brave Browser",
+    "edge": "Microsoft Edge",
+    "safari": "Safari",
+    "apple safari": "Safari",
+}
+
 def slot_browser(text: str) -> Optional[str]:
-    t = (text or "").strip().lower()
-    if t in {"safari", "apple safari"}:
-        return "Safari"
-    if t in {"chrome", "google chrome", "chromium"}:
-        return "Google Chrome"
-    return None
+    return BROWSER_ALIASES.get((text or "").strip().lower())
 
 def _normalize_url(u: str) -> str:
     if not u:
@@ -59,28 +84,77 @@ def _normalize_url(u: str) -> str:
     return u  # let caller decide if this should become a search
 
 def _extract_first_json_obj(text: str):
-    m = re.search(r"\{.*\}", text, flags=re.DOTALL)
-    return json.loads(m.group(0)) if m else None
+    # bracket-counted scan from the first "{" to its matching "}" (string-aware, no backtracking)
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth, in_str, esc = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_str:
+            if esc: esc = False
+            elif ch == "\\": esc = True
+            elif ch == '"': in_str = False
+        elif ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return json.loads(text[start:i + 1])
+    return None
 
 def actions_list_for_prompt():
-    return "\n".join([f"- {name}" for name in sorted(ALLOWED_ACTIONS)])
+    return _ACTIONS_LIST_STR
+
+# system prompt with the actions list filled in; neither input changes at runtime
+_PROMPT_PREFIX = SYSTEM_PROMPT_TMPL.replace("{{ACTIONS_LIST}}", actions_list_for_prompt())
 
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
 OLLAMA_URL   = os.getenv("OLLAMA_URL", "http://127.0.0.1:11434/api/generate")
 
+# long-lived client so the connection pool (and keep-alive socket) is reused across requests;
+# created on the first command that misses the local routes
+_OLLAMA = None
+_OLLAMA_LOCK = asyncio.Lock()  # two first-time callers must not both build a client
+
+def _ollama_client():
+    import httpx
+    return httpx.AsyncClient(timeout=45, limits=httpx.Limits(max_keepalive_connections=4))
+
+async def close_ollama():
+    """Close the shared client (server shutdown); the next ollama_route makes a new one."""
+    global _OLLAMA
+    async with _OLLAMA_LOCK:
+        if _OLLAMA is not None:
+            await _OLLAMA.aclose()
+            _OLLAMA = None
+
+def _ollama_request(text: str) -> dict:
+    return {
+        "model": OLLAMA_MODEL,
+        "prompt": f"{_PROMPT_PREFIX}\nUser: {text.strip()}\nOutput:",
+        "stream": False,
+        "options": {"temperature": 0}
+    }
+
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=0.5, max=3))
-def ollama_route(text: str):
-    prompt = SYSTEM_PROMPT_TMPL.replace("{{ACTIONS_LIST}}", actions_list_for_prompt())
-    prompt = f"{prompt}\nUser: {text.strip()}\nOutput:"
-    with httpx.Client(timeout=45) as client:
-        r = client.post(OLLAMA_URL, json={
-            "model": OLLAMA_MODEL,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0}
-        })
+async def ollama_route(text: str):
+    """
+    Ask the local LLM for a plan. Async so the websocket server keeps serving other
+    clients (and gesture frames) while the model runs; sync code can use asyncio.run().
+    """
+    global _OLLAMA
+    async with _OLLAMA_LOCK:
+        if _OLLAMA is None:
+            # import + client setup off the event loop so gesture frames keep flowing meanwhile
+            _OLLAMA = await asyncio.to_thread(_ollama_client)
+    r = await _OLLAMA.post(OLLAMA_URL, json=_ollama_request(text))
     r.raise_for_status()
-    data = r.json()
+    return _parse_ollama_response(r.json())
+
+def _parse_ollama_response(data: dict):
     raw = (data.get("response") or "").strip()
     if raw.startswith("```"):
         raw = raw.strip("`")
@@ -151,36 +225,84 @@ class LocalRouter:
                 exs.append(ex.lower()); labs.append(intent)
         self.labels = labs
         if exs:
+            # rows are L2-normalized (norm="l2"), so a dot product is already the cosine similarity
             self.vec = TfidfVectorizer(ngram_range=(1,2), min_df=1)
-            self.X = self.vec.fit_transform(exs)
+            self.XT = self.vec.fit_transform(exs).T.tocsr()
         else:
-            self.vec = None; self.X = None
+            self.vec = None; self.XT = None
 
     def infer(self, text: str):
         if not self.vec or not text: return (None, 0.0)
         qv = self.vec.transform([text.lower().strip()])
-        sims = cosine_similarity(qv, self.X)[0]
-        idx = sims.argmax()
+        sims = (qv @ self.XT).toarray()[0]
+        idx = int(sims.argmax())
         score = float(sims[idx]); label = self.labels[idx]
         if score >= self.threshold: return (label, score)
         return (None, score)
 
 LOCAL = LocalRouter(INTENTS)
 
+# (intent, compiled patterns, lower-cased examples) in config order, built once at import
+_COMPILED = [
+    (intent, [re.compile(p) for p in spec.get("patterns", [])], [ex.lower() for ex in spec.get("examples", [])])
+    for intent, spec in INTENTS.items() if intent != "meta"
+]
+
+# pattern id -> (intent, compiled regex); the Python regex is only run on candidates to extract slots
+_PATTERN_TABLE = [(intent, pat) for intent, pats, _ in _COMPILED for pat in pats]
+
+def _build_hs_db():
+    """Compile every intent pattern into one Hyperscan database, or None if unavailable."""
+    if hyperscan is None or not _PATTERN_TABLE:
+        return None
+    exprs, flags = [], []
+    for _, pat in _PATTERN_TABLE:
+        src, f = pat.pattern, hyperscan.HS_FLAG_SINGLEMATCH
+        if src.startswith("(?i)"):
+            src, f = src[4:], f | hyperscan.HS_FLAG_CASELESS
+        # Hyperscan has no capture groups; named groups become plain groups
+        exprs.append(re.sub(r"\(\?P<\w+>", "(", src).encode())
+        flags.append(f)
+    try:
+        db = hyperscan.Database()
+        db.compile(expressions=exprs, ids=list(range(len(exprs))), elements=len(exprs), flags=flags)
+        return db
+    except Exception as e:
+        print("hyperscan compile failed, using re:", e)
+        return None
+
+_HS_DB = _build_hs_db()
+
+def _regex_route(raw: str):
+    """Return (intent, slots) for the first pattern (in config order) matching raw, else None."""
+    # Hyperscan's \s, \w and case folding are ASCII-only here while re's are Unicode, so
+    # dictated text with e.g. U+00A0 or accents goes straight to re
+    if _HS_DB is not None and raw.isascii():
+        hits = set()
+        _HS_DB.scan(raw.encode(), match_event_handler=lambda pid, *_: hits.add(pid))
+        candidates = [_PATTERN_TABLE[i] for i in sorted(hits)]
+    else:
+        candidates = _PATTERN_TABLE
+    for intent, pat in candidates:
+        m = pat.match(raw)
+        if m:
+            return intent, {k:v for k,v in m.groupdict().items() if v}
+    return None
+
 def local_route(text: str):
-    raw = (text or "").strip().lower()
+    intent, slots, how = _local_route((text or "").strip().lower())
+    return intent, dict(slots), how  # copy: callers may modify slots
+
+@lru_cache(maxsize=512)
+def _local_route(raw: str):
     # 1) regex first
-    for intent, spec in INTENTS.items():
-        if intent == "meta": continue
-        for pat in spec.get("patterns", []):
-            m = re.match(pat, raw)
-            if m:
-                slots = {k:v for k,v in m.groupdict().items() if v}
-                return intent, slots, "regex"
+    hit = _regex_route(raw)
+    if hit:
+        intent, slots = hit
+        return intent, slots, "regex"
     # 2) keyword contains
-    for intent, spec in INTENTS.items():
-        if intent == "meta": continue
-        for ex in spec.get("examples", []):
+    for intent, _, exs in _COMPILED:
+        for ex in exs:
             if ex in raw:
                 return intent, {}, "keyword"
     # 3) tf-idf
@@ -1,22 +1,198 @@
 # server/primitives.py
+import os
+import json
 import time
+import hashlib
+import threading
 import subprocess
 import pyautogui
 import pyperclip
 from urllib.parse import quote
+from functools import lru_cache
 from typing import Optional
 
+try:
+    import Quartz  # pyobjc-framework-Quartz (installed with pyautogui on macOS)
+except Exception:
+    Quartz = None
+
+try:
+    from AppKit import NSWorkspace, NSWorkspaceLaunchDefault  # pyobjc-framework-Cocoa (a Quartz dependency)
+    from Foundation import NSURL
+except Exception:
+    NSWorkspace = None
+
 pyautogui.FAILSAFE = True
 pyautogui.PAUSE = 0.05
 
-def run_applescript(script: str) -> Optional[str]:
+# macOS virtual key codes (Carbon kVK_ANSI_*)
+KVK_ANSI_C = 8
+KVK_ANSI_V = 9
+
+_key_events = {}  # (keycode, flags) -> (down, up) CGEvents, built once and reposted
+
+def cg_keypress(keycode: int, flags: int = 0):
+    """
+    Post a key down/up pair straight to the HID event tap. Unlike pyautogui there is no
+    PAUSE between events. Caller must check Quartz is available.
+    """
+    evts = _key_events.get((keycode, flags))
+    if evts is None:
+        evts = []
+        for down in (True, False):
+            e = Quartz.CGEventCreateKeyboardEvent(None, keycode, down)
+            Quartz.CGEventSetFlags(e, flags)
+            evts.append(e)
+        _key_events[(keycode, flags)] = evts
+    for e in evts:
+        Quartz.CGEventPost(Quartz.kCGHIDEventTap, e)
+
+# Long-lived osascript (JXA) process: compiles each AppleScript source once with NSAppleScript
+# and runs it on request, so a call costs a pipe round-trip instead of a fork/exec + compile.
+# One JSON object per line each way:
+#   -> {"src": "...", "args": [...]}    <- {"ok": true, "out": "..."} | {"ok": false, "error": "..."}
+# "args" are passed to the script's `on run argv` handler; {"src": "...", "compile": true}
+# only compiles and caches the script.
+_OSA_HELPER_JS = r"""
+ObjC.import("Foundation");
+const stdin = $.NSFileHandle.fileHandleWithStandardInput;
+const stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+const compiled = {};
+function reply(obj) {
+    stdout.writeData($(JSON.stringify(obj) + "\n").dataUsingEncoding($.NSUTF8StringEncoding));
+}
+function runOne(req) {
+    let script = compiled[req.src];
+    if (!script) script = compiled[req.src] = $.NSAppleScript.alloc.initWithSource(req.src);
+    const err = Ref();
+    if (req.compile) {
+        if (script.compileAndReturnError(err)) return {ok: true, out: ""};
+        const info = ObjC.deepUnwrap(err[0]) || {};
+        return {ok: false, error: String(info.NSAppleScriptErrorMessage || "compile error")};
+    }
+    let res;
+    if (req.args && req.args.length) {
+        // 'aevt'/'oapp' event whose direct object is the argv list
+        const evt = $.NSAppleEventDescriptor.appleEventWithEventClassEventIDTargetDescriptorReturnIDTransactionID(
+            0x61657674, 0x6f617070, $.NSAppleEventDescriptor.nullDescriptor, -1, 0);
+        const argv = $.NSAppleEventDescriptor.listDescriptor;
+        req.args.forEach((a, i) => argv.insertDescriptorAtIndex($.NSAppleEventDescriptor.descriptorWithString(a), i + 1));
+        evt.setParamDescriptorForKeyword(argv, 0x2d2d2d2d);
+        res = script.executeAppleEventError(evt, err);
+    } else {
+        res = script.executeAndReturnError(err);
+    }
+    if (res.isNil()) {
+        const info = ObjC.deepUnwrap(err[0]) || {};
+        return {ok: false, error: String(info.NSAppleScriptErrorMessage || info.NSAppleScriptErrorBriefMessage || "error")};
+    }
+    return {ok: true, out: ObjC.unwrap(res.stringValue) || ""};
+}
+let buf = "";
+for (;;) {
+    const data = stdin.availableData;
+    if (data.length == 0) break;  // EOF: server went away
+    buf += $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+    let nl;
+    while ((nl = buf.indexOf("\n")) >= 0) {
+        const line = buf.slice(0, nl);
+        buf = buf.slice(nl + 1);
+        try { reply(runOne(JSON.parse(line))); }
+        catch (e) { reply({ok: false, error: String(e)}); }
+    }
+}
+"""
+
+_osa = None
+_osa_lock = threading.RLock()
+_osa_failures = 0
+_OSA_MAX_FAILURES = 3   # stop respawning a helper that keeps dying; use one-shot osascript
+
+def _osa_call(script: str, args, compile_only=False) -> dict:
+    global _osa
+    with _osa_lock:
+        if _osa is None or _osa.poll() is not None:
+            _osa = subprocess.Popen(
+                ["osascript", "-l", "JavaScript", "-e", _OSA_HELPER_JS],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1
+            )
+        # json.dumps escapes non-ASCII, so the helper never sees a split UTF-8 sequence
+        req = {"src": script, "compile": True} if compile_only else {"src": script, "args": list(args)}
+        _osa.stdin.write(json.dumps(req) + "\n")
+        _osa.stdin.flush()
+        line = _osa.stdout.readline()
+    if not line:
+        raise RuntimeError("osascript helper exited")
+    return json.loads(line)
+
+def _osa_reset():
+    global _osa
+    with _osa_lock:
+        if _osa is not None:
+            try: _osa.kill()
+            except Exception: pass
+        _osa = None
+
+# per-user cache (not the shared temp dir): whatever is found here gets executed
+_SCPT_DIR = os.path.join(os.path.expanduser("~"), "Library", "Caches", "handsfree-office", "scpt")
+
+def _scpt_dir_ok() -> bool:
+    """Create the cache dir 0700; only trust it if we own it and nobody else can write it."""
+    os.makedirs(_SCPT_DIR, mode=0o700, exist_ok=True)
+    st = os.stat(_SCPT_DIR)
+    return st.st_uid == os.getuid() and not (st.st_mode & 0o022)
+
+@lru_cache(maxsize=64)
+def _compiled_scpt(script: str) -> Optional[str]:
+    """
+    Path of a .scpt compiled once with osacompile, so the one-shot fallback skips
+    re-parsing the source each call. None if compilation isn't possible.
+    """
+    path = os.path.join(_SCPT_DIR, hashlib.sha1(script.encode()).hexdigest() + ".scpt")
+    try:
+        if not _scpt_dir_ok():
+            print("compiled script cache not private, running from source:", _SCPT_DIR)
+            return None
+        if os.path.exists(path):
+            return path
+        tmp = f"{path}.{os.getpid()}.tmp"
+        subprocess.run(["osacompile", "-o", tmp, "-e", script], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        os.replace(tmp, path)  # never leave a half-written .scpt at the final path
+        return path
+    except Exception as e:
+        print("osacompile error, running from source:", e)
+        return None
+
+def run_applescript(script: str, *args: str) -> Optional[str]:
     """
     Execute the given AppleScript and return stdout as a string (stripped).
+    Extra args are passed to the script's `on run argv` handler.
     Returns None on failure. Errors are printed for debugging but do not raise.
     """
+    global _osa_failures
+    if _osa_failures < _OSA_MAX_FAILURES:
+        try:
+            res = _osa_call(script, args)
+            _osa_failures = 0
+            if not res.get("ok"):
+                # Surface AppleScript failures without crashing the server.
+                print("AppleScript error:", res.get("error", ""))
+                return ""
+            return str(res.get("out") or "").strip()
+        except Exception as e:
+            _osa_failures += 1
+            print("osascript helper error, falling back to one-shot:", e)
+            _osa_reset()
     try:
+        compiled = _compiled_scpt(script)
+        src = [compiled] if compiled else ["-e", script]
         proc = subprocess.run(
-            ["osascript", "-e", script],
+            ["osascript", *src, *args],
             check=False,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -30,11 +206,157 @@ def run_applescript(script: str) -> Optional[str]:
         print("AppleScript exception:", e)
         return None
 
+def precompile_applescripts(*scripts: str):
+    """
+    Start the osascript helper and compile the given sources ahead of time, so the
+    first voice command doesn't pay for process startup + compilation. Best effort.
+    """
+    for script in scripts:
+        try:
+            res = _osa_call(script, (), compile_only=True)
+            if not res.get("ok"):
+                print("AppleScript precompile error:", res.get("error", ""))
+        except Exception as e:
+            print("AppleScript precompile skipped:", e)
+            return
+
+@lru_cache(maxsize=64)
+def _app_url(app: str):
+    """Bundle URL for an app name or bundle id, or None if LaunchServices doesn't know it."""
+    ws = NSWorkspace.sharedWorkspace()
+    if "." in app and " " not in app:
+        u = ws.URLForApplicationWithBundleIdentifier_(app)
+        if u is not None:
+            return u
+    path = ws.fullPathForApplication_(app)
+    return NSURL.fileURLWithPath_(path) if path else None
+
+def open_url_ls(url: str, app: Optional[str] = None) -> bool:
+    """
+    Open url through LaunchServices in-process (in `app` if given, else the default
+    handler); no osascript/open fork. False if unavailable or the open failed.
+    """
+    if NSWorkspace is None:
+        return False
+    try:
+        nsurl = NSURL.URLWithString_(url)
+        if nsurl is None:
+            return False
+        ws = NSWorkspace.sharedWorkspace()
+        if app is None:
+            return bool(ws.openURL_(nsurl))
+        app_url = _app_url(app)
+        if app_url is None:
+            return False
+        running, err = ws.openURLs_withApplicationAtURL_options_configuration_error_(
+            [nsurl], app_url, NSWorkspaceLaunchDefault, {}, None)
+        if running is None:
+            print("LaunchServices open error:", err)
+            return False
+        return True
+    except Exception as e:
+        print("LaunchServices open exception:", e)
+        return False
+
+def launch_app_ls(app: str) -> bool:
+    """Launch/activate an app by name or bundle id through LaunchServices in-process."""
+    if NSWorkspace is None:
+        return False
+    try:
+        app_url = _app_url(app)
+        if app_url is None:
+            return False
+        running, err = NSWorkspace.sharedWorkspace().launchApplicationAtURL_options_configuration_error_(
+            app_url, NSWorkspaceLaunchDefault, {}, None)
+        if running is None:
+            print("LaunchServices launch error:", err)
+            return False
+        return True
+    except Exception as e:
+        print("LaunchServices launch exception:", e)
+        return False
+
+def spawn_open(*args: str) -> int:
+    """Run /usr/bin/open with args via posix_spawn (no shell, no Popen bookkeeping); exit status."""
+    try:
+        pid = os.posix_spawn("/usr/bin/open", ["open", *args], os.environ)
+        return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+    except Exception as e:
+        print("open spawn error:", e)
+        return -1
+
+# Cursor position we last posted; re-read from the system after a pause in our own moves
+# (the user may have touched the trackpad) instead of querying it on every tick.
+_cursor = [0.0, 0.0]
+_cursor_bounds = None
+_cursor_t = 0.0
+_CURSOR_RESYNC_S = 0.25
+_move_event = None  # mouse-moved CGEvent, created once and repositioned per move
+
+def _desktop_bounds():
+    """(x0, y0, x1, y1) around all active displays, so moves can reach secondary monitors."""
+    err, ids, n = Quartz.CGGetActiveDisplayList(16, None, None)
+    rects = [Quartz.CGDisplayBounds(d) for d in (ids[:n] if not err and n else (Quartz.CGMainDisplayID(),))]
+    return (min(r.origin.x for r in rects), min(r.origin.y for r in rects),
+            max(r.origin.x + r.size.width for r in rects) - 1,
+            max(r.origin.y + r.size.height for r in rects) - 1)
+
+def _cursor_pos():
+    global _cursor_bounds, _cursor_t
+    now = time.monotonic()
+    if now - _cursor_t > _CURSOR_RESYNC_S:
+        loc = Quartz.CGEventGetLocation(Quartz.CGEventCreate(None))
+        _cursor[0], _cursor[1] = loc.x, loc.y
+        _cursor_bounds = _desktop_bounds()
+    _cursor_t = now
+    return _cursor, _cursor_bounds
+
+def move_cursor_rel(dx: float, dy: float):
+    """Move the cursor by (dx, dy) px with a single mouse-moved CGEvent (clamped to the desktop)."""
+    if Quartz is None:
+        pyautogui.moveRel(dx, dy, duration=0)
+        return
+    global _move_event
+    pos, (x0, y0, x1, y1) = _cursor_pos()
+    pos[0] = min(max(pos[0] + dx, x0), x1)
+    pos[1] = min(max(pos[1] + dy, y0), y1)
+    if _move_event is None:
+        _move_event = Quartz.CGEventCreateMouseEvent(None, Quartz.kCGEventMouseMoved, (pos[0], pos[1]), Quartz.kCGMouseButtonLeft)
+    else:
+        Quartz.CGEventSetLocation(_move_event, (pos[0], pos[1]))  # reuse one event, like cg_keypress
+    # relative motion for apps that read deltas rather than the absolute location
+    Quartz.CGEventSetIntegerValueField(_move_event, Quartz.kCGMouseEventDeltaX, int(dx))
+    Quartz.CGEventSetIntegerValueField(_move_event, Quartz.kCGMouseEventDeltaY, int(dy))
+    Quartz.CGEventPost(Quartz.kCGHIDEventTap, _move_event)
+
+def left_click():
+    """Left click (down + up) at the current cursor position."""
+    if Quartz is None:
+        pyautogui.click(_pause=False)  # one call, without PAUSE after each half
+        return
+    # where our own moves put the cursor; a fresh system query can lag a just-posted move
+    pos, _ = _cursor_pos()
+    for kind in (Quartz.kCGEventLeftMouseDown, Quartz.kCGEventLeftMouseUp):
+        e = Quartz.CGEventCreateMouseEvent(None, kind, (pos[0], pos[1]), Quartz.kCGMouseButtonLeft)
+        Quartz.CGEventSetIntegerValueField(e, Quartz.kCGMouseEventClickState, 1)
+        Quartz.CGEventPost(Quartz.kCGHIDEventTap, e)
+
+def scroll_lines(lines: int):
+    """Scroll by whole lines (positive = up) with a single scroll-wheel event."""
+    if Quartz is None:
+        pyautogui.scroll(int(lines))
+        return
+    e = Quartz.CGEventCreateScrollWheelEvent(None, Quartz.kCGScrollEventUnitLine, 1, int(lines))
+    Quartz.CGEventPost(Quartz.kCGHIDEventTap, e)
+
 def focused_typing(text: str):
     if not text:
         return
     pyperclip.copy(text)
-    pyautogui.hotkey("command", "v")
+    if Quartz is not None:
+        cg_keypress(KVK_ANSI_V, Quartz.kCGEventFlagMaskCommand)
+    else:
+        pyautogui.hotkey("command", "v")
 
 def open_gmail_compose():
     # NOTE: superseded by server.gmail_compose which respects the active browser
@@ -48,7 +370,9 @@ def open_gmail_compose():
     """
     run_applescript(script)
     time.sleep(1.0)
-    try: pyautogui.press("c")  # Gmail compose fallback
+    try:  # Gmail compose fallback
+        if Quartz is not None: cg_keypress(KVK_ANSI_C)
+        else: pyautogui.press("c")
     except: pass
 
 def start_keynote_slideshow():
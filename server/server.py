@@ -1,24 +1,33 @@
 # server/server.py
-import json, asyncio, sys
+import asyncio, sys, math, socket
+import orjson
 from pathlib import Path
-import websockets
+# new Sans-I/O asyncio implementation (recv(decode=False), send(text=True)), not websockets.legacy
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
 from gestures import CameraGestureEngine
 
-from urllib.parse import urlparse, quote, urlencode
+from urllib.parse import urlparse, quote_plus, urlencode
 
 from primitives import (
     run_applescript, focused_typing, open_gmail_compose,
-    start_keynote_slideshow, mailto_url
+    start_keynote_slideshow, mailto_url, scroll_lines,
+    move_cursor_rel, left_click, precompile_applescripts, open_url_ls,
+    launch_app_ls, spawn_open
 )
+from _jit import njit
 from nlu import (
-    KEYMAP, SLOTS, slot_app, slot_site,
-    local_route, ollama_route, validate_and_normalize_plan
+    KEYMAP, SLOTS, slot_app, slot_site, slot_browser, CHROME_FAMILY, BROWSER_ALIASES,
+    local_route, ollama_route, close_ollama, validate_and_normalize_plan
 )
 import time
-import subprocess, shlex
-import datetime
+import logging
+import concurrent.futures
+import queue, threading
+from functools import lru_cache, partial
+from collections import deque
 
-def now(): return datetime.datetime.now().strftime("%H:%M:%S")
+log = logging.getLogger("hf")
 
 REPEAT_BLOCKLIST = {"type_text", "mailto_compose"}  # intents we won't auto-repeat
 LAST_EXECUTED = None  # ensure repeat works even before any action runs
@@ -26,27 +35,16 @@ LAST_EXECUTED = None  # ensure repeat works even before any action runs
 # ===== Browser preference state (active browser selection) =====
 PREFERRED_BROWSER = None  # "Safari" or any app in CHROME_FAMILY
 
-CHROME_FAMILY = {
-    "Google Chrome",
-    "Brave Browser",
-    "Microsoft Edge",
-    "Vivaldi",
-}
+BROWSER_APPS = frozenset(BROWSER_ALIASES.values())  # aliases are shared with nlu.slot_browser
 
 def set_preferred_browser(name: str):
     """Set the active browser preference. Accepts Safari or any of CHROME_FAMILY names."""
-    global PREFERRED_BROWSER
-    if not name:
-        return
-    n = str(name).strip()
-    if n.lower() in {"safari", "apple safari"}:
-        PREFERRED_BROWSER = "Safari"
-    elif n in CHROME_FAMILY or n.lower() in {"google chrome", "chrome", "brave browser", "microsoft edge", "vivaldi", "brave", "edge"}:
-        # normalize common lowercase to canonical names
-        if n.lower() == "chrome": n = "Google Chrome"
-        elif n.lower() == "brave": n = "Brave Browser"
-        elif n.lower() == "edge": n = "Microsoft Edge"
-        PREFERRED_BROWSER = n
+    global PREFERRED_BROWSER, _open_url_fn
+    canon = slot_browser(str(name or ""))
+    if canon:
+        PREFERRED_BROWSER = canon
+        # resolve the dispatch once here instead of on every URL open
+        _open_url_fn = partial(open_url_in_browser, browser=canon)
 
 # ===== Gesture → Action tuning =====
 import pyautogui
@@ -57,55 +55,55 @@ def browser_history_back():
     try:
         pyautogui.hotkey("command", "[")
     except Exception as e:
-        print("history_back error:", e)
+        log.warning("history_back error: %s", e)
 
 def browser_history_forward():
     try:
         pyautogui.hotkey("command", "]")
     except Exception as e:
-        print("history_forward error:", e)
+        log.warning("history_forward error: %s", e)
 
 def browser_next_tab():
     try:
         pyautogui.hotkey("ctrl", "tab")
     except Exception as e:
-        print("next_tab error:", e)
+        log.warning("next_tab error: %s", e)
 
 def browser_prev_tab():
     try:
         pyautogui.hotkey("ctrl", "shift", "tab")
     except Exception as e:
-        print("prev_tab error:", e)
+        log.warning("prev_tab error: %s", e)
 
 def browser_zoom_in():
     try:
         pyautogui.hotkey("command", "=")
     except Exception as e:
-        print("zoom_in error:", e)
+        log.warning("zoom_in error: %s", e)
 
 def browser_zoom_out():
     try:
         pyautogui.hotkey("command", "-")
     except Exception as e:
-        print("zoom_out error:", e)
+        log.warning("zoom_out error: %s", e)
 
 def browser_zoom_reset():
     try:
         pyautogui.hotkey("command", "0")
     except Exception as e:
-        print("zoom_reset error:", e)
+        log.warning("zoom_reset error: %s", e)
 
 def scroll_up(amount=240):
     try:
-        pyautogui.scroll(abs(int(amount)))
+        scroll_lines(abs(int(amount)))
     except Exception as e:
-        print("scroll_up error:", e)
+        log.warning("scroll_up error: %s", e)
 
 def scroll_down(amount=240):
     try:
-        pyautogui.scroll(-abs(int(amount)))
+        scroll_lines(-abs(int(amount)))
     except Exception as e:
-        print("scroll_down error:", e)
+        log.warning("scroll_down error: %s", e)
 
 MOUSE_MODE = "cursor"           # cursor (not scroll)
 # Extra smoothing/tuning (feel free to tweak live)
@@ -117,88 +115,197 @@ DEAD_ZONE_DEG = 10.0
 V_MIN = 120.0          # px/s at threshold
 V_MAX = 520.0          # px/s at saturation
 SAT_ANGLE_DEG = 25.0   # degrees beyond the dead zone where speed saturates
-ALPHA_ANGLE = 0.2      # low-pass on angles
 MAX_STEP_PX = 16.0     # clamp per-tick pixel move
 UPDATE_HZ = 30.0       # target update frequency (informational)
+TILT_TICK_HZ = 60.0    # queued tilt frames are drained into one cursor move per tick
+MOVE_EMIT_HZ = 90.0    # cap on posted cursor moves across all connections (display ≤120Hz)
+TILT_MAX_BATCH = 8     # keep only the newest frames if a stalled link delivers a burst
+
+# --- One-Euro smoothing: cutoff (Hz) = MIN_CUTOFF + BETA * |speed of the signal| ---
+EURO_MIN_CUTOFF = 1.0  # jitter removal at rest
+EURO_D_CUTOFF = 1.0    # cutoff for the speed estimate itself
+EURO_BETA_VEL = 0.8    # vx/vy path (normalized units/s)
+EURO_BETA_ANGLE = 0.05 # angle path (deg/s)
+
+# --- gyro+accel Kalman fusion (used when tilt_angles carries gyro_dps / accel_g) ---
+KALMAN_Q_ANGLE = 0.001 # process noise on the angle
+KALMAN_Q_BIAS = 0.003  # process noise on the gyro bias
+KALMAN_R = 0.03        # accel-angle measurement noise (deg^2)
 
 # --- Frontmost app + browser/tab helpers ---------------------------------------------------------
 
-def get_frontmost_app_name() -> str:
-    """Return the name of the frontmost macOS app, or empty string on failure."""
-    script = '''
+# Fixed AppleScript sources; the URL / app name comes in through `on run argv`. Since the
+# source never changes, the osascript helper compiles each one once and reuses it.
+APPLESCRIPTS = {
+    "frontmost_app": '''
     tell application "System Events"
         set frontApp to name of first application process whose frontmost is true
     end tell
     return frontApp
-    '''
+    ''',
+    # argv: {app name, url}; Chromium browsers share Chrome's scripting dictionary
+    "open_url_chrome": '''
+    on run argv
+        set appName to item 1 of argv
+        set theURL to item 2 of argv
+        try
+            using terms from application "Google Chrome"
+                tell application appName
+                    activate
+                    if (count of windows) = 0 then make new window
+                    set newTab to make new tab at end of tabs of front window
+                    set URL of newTab to theURL
+                end tell
+            end using terms from
+            return 0
+        on error errText number errNum
+            return errNum
+        end try
+    end run
+    ''',
+    # argv: {url}
+    "open_url_safari": '''
+    on run argv
+        set theURL to item 1 of argv
+        try
+            tell application "Safari"
+                activate
+                if (count of windows) = 0 then make new document
+                tell window 1
+                    set current tab to (make new tab with properties {URL:theURL})
+                end tell
+            end tell
+            return 0
+        on error errText number errNum
+            return errNum
+        end try
+    end run
+    ''',
+    # argv: {bundle id}
+    "launch_app_id": '''
+    on run argv
+        try
+            tell application id (item 1 of argv)
+                if it is not running then launch
+                activate
+            end tell
+            return 0
+        on error errText number errNum
+            return errNum
+        end try
+    end run
+    ''',
+    # argv: {app name}
+    "launch_app": '''
+    on run argv
+        try
+            tell application (item 1 of argv)
+                if it is not running then launch
+                activate
+            end tell
+            return 0
+        on error errText number errNum
+            return errNum
+        end try
+    end run
+    ''',
+}
+
+FRONT_APP_TTL_S = 0.5
+_front_cache = (0.0, "")  # (monotonic time of lookup, app name)
+
+def invalidate_frontmost_app():
+    """Forget the cached frontmost app (call after we activate something ourselves)."""
+    global _front_cache
+    _front_cache = (0.0, "")
+
+def note_frontmost_app(name: str):
+    """We just activated `name` ourselves: it is the frontmost app, no lookup needed."""
+    global _front_cache
+    _front_cache = (time.monotonic(), name)
+
+def get_frontmost_app_name() -> str:
+    """Return the name of the frontmost macOS app, or empty string on failure (cached briefly)."""
+    global _front_cache
+    t, cached = _front_cache
+    now = time.monotonic()
+    if cached and now - t < FRONT_APP_TTL_S:
+        return cached
     try:
-        name = run_applescript(script)
-        return str(name).strip()
+        name = (run_applescript(APPLESCRIPTS["frontmost_app"]) or "").strip()
     except Exception as e:
-        print("frontmost app error:", e)
+        log.warning("frontmost app error: %s", e)
         return ""
+    if name:
+        _front_cache = (now, name)
+    return name
+
+
+def _script_rc(out) -> int:
+    """Error number returned by the templates (0 = ok); -1 if the script didn't run."""
+    try:
+        return int(out)
+    except (TypeError, ValueError):
+        return -1
 
 
 def applescript_open_url_in_chrome_family(app_name: str, url: str) -> int:
     """Open a URL in a Chromium-based browser via AppleScript tab API."""
-    script = f'''
-    try
-        tell application "{app_name}"
-            activate
-            if (count of windows) = 0 then make new window
-            set newTab to make new tab at end of tabs of front window
-            set URL of newTab to "{url}"
-        end tell
-        return 0
-    on error errText number errNum
-        return errNum
-    end try
-    '''
-    return int(run_applescript(script))
+    return _script_rc(run_applescript(APPLESCRIPTS["open_url_chrome"], app_name, url))
 
 
 def applescript_open_url_in_safari(url: str) -> int:
-    script = f'''
-    try
-        tell application "Safari"
-            activate
-            if (count of windows) = 0 then make new document
-            tell window 1
-                set current tab to (make new tab with properties {{URL:"{url}"}})
-            end tell
-        end tell
-        return 0
-    on error errText number errNum
-        return errNum
-    end try
-    '''
-    return int(run_applescript(script))
+    return _script_rc(run_applescript(APPLESCRIPTS["open_url_safari"], url))
+
+
+@lru_cache(maxsize=32)
+def _opened_status(browser: str) -> str:
+    return f"opened_url_{browser.lower().replace(' ', '_')}"
 
 
 def open_url_in_browser(url: str, browser: str) -> str:
     """Open URL in the specific browser name provided."""
+    invalidate_frontmost_app()  # the browser gets activated below
+    # LaunchServices in-process first; the AppleScript tab API covers hosts without AppKit
+    if open_url_ls(url, browser):
+        note_frontmost_app(browser)
+        return _opened_status(browser)
     if browser == "Safari":
         rc = applescript_open_url_in_safari(url)
         if rc == 0:
+            note_frontmost_app("Safari")
             return "opened_url_safari"
     elif browser in CHROME_FAMILY:
         rc = applescript_open_url_in_chrome_family(browser, url)
         if rc == 0:
-            return f"opened_url_{browser.lower().replace(' ', '_')}"
-    # If we get here, try a generic open -a
-    try:
-        subprocess.check_call(f"open -a {shlex.quote(browser)} {shlex.quote(url)}", shell=True)
-        return f"opened_url_{browser.lower().replace(' ', '_')}_fallback"
-    except Exception as e:
-        print("open -a fallback error:", e)
-        # Final fallback: default handler
-        try:
-            subprocess.check_call(f"open {shlex.quote(url)}", shell=True)
-            return "opened_url_default_fallback"
-        except Exception as e2:
-            print("open default fallback error:", e2)
-            return "open_url_failed"
+            note_frontmost_app(browser)
+            return _opened_status(browser)
+    # If we get here, try a generic open -a, then the default handler
+    if spawn_open("-a", browser, url) == 0:
+        return _opened_status(browser) + "_fallback"
+    log.warning("open -a %s fallback failed", browser)
+    if spawn_open(url) == 0:
+        return "opened_url_default_fallback"
+    log.warning("open default fallback failed")
+    return "open_url_failed"
+
+
+def _open_url_unset(url: str) -> str:
+    """No preferred browser: use the frontmost app if it is a browser, else the system default."""
+    front = get_frontmost_app_name()
+    if front in BROWSER_APPS:
+        return open_url_in_browser(url, front)
+    # fall back to default if no browser is frontmost
+    if open_url_ls(url):
+        return "opened_url_default"
+    if spawn_open(url) == 0:
+        return "opened_url_default"
+    log.warning("open default failed")
+    return "open_url_failed"
+
 
+# set_preferred_browser swaps this for open_url_in_browser bound to the chosen browser
+_open_url_fn = _open_url_unset
 
 def open_url_in_active_browser(url: str) -> str:
     """
@@ -207,18 +314,7 @@ def open_url_in_active_browser(url: str) -> str:
     - else use frontmost app if it is a browser
     - else use system default
     """
-    if PREFERRED_BROWSER:
-        return open_url_in_browser(url, PREFERRED_BROWSER)
-    front = get_frontmost_app_name()
-    if front == "Safari" or front in CHROME_FAMILY:
-        return open_url_in_browser(url, front)
-    # fall back to default if no browser is frontmost
-    try:
-        subprocess.check_call(f"open {shlex.quote(url)}", shell=True)
-        return "opened_url_default"
-    except Exception as e:
-        print("open default error:", e)
-        return "open_url_failed"
+    return _open_url_fn(url)
 
 
 def open_url_in_frontmost_browser(url: str) -> str:
@@ -231,40 +327,24 @@ def open_mac_app(app_raw: str) -> int:
     app = app_raw.strip()
     if not app:
         return 1
-    if "." in app:  # looks like bundle id, e.g., "zoom.us"
-        script = f'''
-        try
-            tell application id "{app}"
-                if it is not running then launch
-                activate
-            end tell
-            return 0
-        on error errText number errNum
-            return errNum
-        end try
-        '''
-    else:
-        script = f'''
-        try
-            tell application "{app}"
-                if it is not running then launch
-                activate
-            end tell
-            return 0
-        on error errText number errNum
-            return errNum
-        end try
-        '''
-    rc = run_applescript(script)
-    if str(rc).strip() == "0":
+    invalidate_frontmost_app()
+    # dotted names may be bundle ids ("com.apple.Safari") or plain app names ("zoom.us"):
+    # try them as an id first, then by name
+    maybe_id = "." in app and " " not in app
+    # in-process LaunchServices, then open(1) — neither needs AppleScript compilation
+    if launch_app_ls(app):
         return 0
-    # Fallback: open -a "App"
-    try:
-        subprocess.check_call(f"open -a {shlex.quote(app)}", shell=True)
+    if maybe_id and spawn_open("-b", app) == 0:
         return 0
-    except Exception as e:
-        print("open_app error:", e)
-        return 1
+    if spawn_open("-a", app) == 0:
+        return 0
+    # Last resort: AppleScript launch/activate
+    if maybe_id and _script_rc(run_applescript(APPLESCRIPTS["launch_app_id"], app)) == 0:
+        return 0
+    if _script_rc(run_applescript(APPLESCRIPTS["launch_app"], app)) == 0:
+        return 0
+    log.warning("open_app failed: %s", app)
+    return 1
 
 
 def _gmail_compose_url(to: str = "", subject: str = "", body: str = "") -> str:
@@ -278,128 +358,276 @@ def _gmail_compose_url(to: str = "", subject: str = "", body: str = "") -> str:
     return "https://mail.google.com/mail/?" + urlencode(params, doseq=False, safe=":/?&=")
 
 
+GMAIL_COMPOSE_READY_S = 0.8  # page load before the send hotkey can reach the compose form
+
 def gmail_compose_in_active_browser(to: str, subject: str, body: str, send: bool = False) -> str:
     url = _gmail_compose_url(to, subject, body)
     res = open_url_in_active_browser(url)
-    # small delay so the compose UI is ready
-    time.sleep(0.8)
+    if not res.startswith("opened_url"):
+        return "gmail_compose_failed"  # don't fire the send hotkey into whatever app is in front
     if send:
+        # only the hotkey needs the compose UI; a plain compose returns right away
+        time.sleep(GMAIL_COMPOSE_READY_S)
         try:
             pyautogui.hotkey("command", "enter")
         except Exception as e:
-            print("gmail send hotkey error:", e)
+            log.warning("gmail send hotkey error: %s", e)
             return "gmail_send_failed"
-    return "gmail_compose_opened" if res.startswith("opened_url") else "gmail_compose_failed"
+    return "gmail_compose_opened"
 
 # ----------------- Mouse Controller -----------------
 
+class OneEuroFilter:
+    """
+    One-Euro adaptive low-pass filter: heavy smoothing when the signal is still,
+    little lag when it moves fast (cutoff grows with the filtered speed).
+    """
+    def __init__(self, min_cutoff=EURO_MIN_CUTOFF, beta=0.007, d_cutoff=EURO_D_CUTOFF):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x_f = None
+        self.dx_f = 0.0
+
+    @staticmethod
+    def _alpha(rate, cutoff):
+        return 1.0 / (1.0 + rate / (2.0 * math.pi * cutoff))
+
+    def __call__(self, x, dt):
+        if self.x_f is None:
+            self.x_f = x
+            return x
+        rate = 1.0 / dt
+        a_d = self._alpha(rate, self.d_cutoff)
+        self.dx_f = a_d * (x - self.x_f) * rate + (1 - a_d) * self.dx_f
+        a = self._alpha(rate, self.min_cutoff + self.beta * abs(self.dx_f))
+        self.x_f = a * x + (1 - a) * self.x_f
+        return self.x_f
+
+class KalmanAngle:
+    """
+    Two-state (angle, gyro bias) Kalman filter: the gyro rate drives the prediction
+    (smooth short-term), the accelerometer angle corrects it (no long-term drift).
+    """
+    def __init__(self, q_angle=KALMAN_Q_ANGLE, q_bias=KALMAN_Q_BIAS, r=KALMAN_R):
+        self.q_angle = q_angle
+        self.q_bias = q_bias
+        self.r = r
+        self.reset()
+
+    def reset(self):
+        self.angle = None
+        self.bias = 0.0
+        self.p00 = self.p01 = self.p10 = self.p11 = 0.0
+
+    def __call__(self, rate, meas, dt):
+        if self.angle is None:
+            self.angle = meas
+            return meas
+        # predict with the bias-corrected gyro rate
+        self.angle += dt * (rate - self.bias)
+        self.p00 += dt * (dt * self.p11 - self.p01 - self.p10 + self.q_angle)
+        self.p01 -= dt * self.p11
+        self.p10 -= dt * self.p11
+        self.p11 += self.q_bias * dt
+        # correct with the accelerometer angle
+        s = self.p00 + self.r
+        k0 = self.p00 / s
+        k1 = self.p10 / s
+        y = meas - self.angle
+        self.angle += k0 * y
+        self.bias += k1 * y
+        p00, p01 = self.p00, self.p01
+        self.p00 -= k0 * p00
+        self.p01 -= k0 * p01
+        self.p10 -= k1 * p00
+        self.p11 -= k1 * p01
+        return self.angle
+
+def accel_angles(accel_g):
+    """
+    (roll, pitch) in degrees from the gravity vector in the iPhone device frame
+    (x right, y top, z out of the screen); same signs as roll_deg / pitch_deg.
+    """
+    gx, gy, gz = accel_g
+    return math.degrees(math.atan2(gx, -gz)), math.degrees(math.atan2(gy, -gz))
+
+@njit(cache=True, fastmath=True)
+def _axis_speed(angle_deg):
+    eff = max(0.0, abs(angle_deg) - DEAD_ZONE_DEG)
+    n = min(1.0, eff / SAT_ANGLE_DEG)
+    return V_MIN + (V_MAX - V_MIN) * (n * n)
+
+@njit(cache=True, fastmath=True)
+def _vel_step(vx_f, vy_f, dt, paused):
+    """Filtered velocity -> (dx, dy, vx_f, vy_f) after deadband, pause decay and clamp."""
+    # small deadband; decay to zero if the stream paused (prevents drift)
+    if paused or abs(vx_f) < CURSOR_DEAD_SPEED:
+        vx_f = 0.0
+    if paused or abs(vy_f) < CURSOR_DEAD_SPEED:
+        vy_f = 0.0
+    # translate normalized velocity to pixel delta (screen y is down) and clamp
+    # the per-frame delta to avoid sudden jumps on network hiccups
+    dx = max(-24.0, min(24.0, vx_f * CURSOR_PIXELS_PER_SEC * dt))
+    dy = max(-24.0, min(24.0, -vy_f * CURSOR_PIXELS_PER_SEC * dt))
+    return dx, dy, vx_f, vy_f
+
+@njit(cache=True, fastmath=True)
+def _angle_step(roll_f, pitch_f, dt):
+    """Filtered angles -> (dx, dy) along the single dominant axis (no diagonals)."""
+    ax = abs(roll_f)
+    ay = abs(pitch_f)
+    vx = 0.0
+    vy = 0.0
+    if ax >= ay:
+        # horizontal dominates
+        if ax > DEAD_ZONE_DEG:
+            vx = (1.0 if roll_f > 0 else -1.0) * _axis_speed(roll_f)
+    elif ay > DEAD_ZONE_DEG:
+        # vertical dominates; forward tilt (pitch > 0) moves cursor down (+y)
+        vy = (1.0 if pitch_f > 0 else -1.0) * _axis_speed(pitch_f)
+    # integrate to per-tick deltas and clamp
+    dx = max(-MAX_STEP_PX, min(MAX_STEP_PX, vx * dt))
+    dy = max(-MAX_STEP_PX, min(MAX_STEP_PX, vy * dt))
+    return dx, dy
+
+# compile the kernels (no-op without numba) at import instead of on the first tilt frame
+_vel_step(0.0, 0.0, 0.01, False)
+_angle_step(0.0, 0.0, 0.01)
+
 class MouseController:
     def __init__(self):
         # filtered velocity components (normalized -1..1) for vx/vy path
         self.vx_f = 0.0
         self.vy_f = 0.0
-        self.alpha = 0.35  # smoothing factor: higher = snappier, lower = smoother
+        self.filt_vx = OneEuroFilter(beta=EURO_BETA_VEL)
+        self.filt_vy = OneEuroFilter(beta=EURO_BETA_VEL)
         self.last_input_t = time.monotonic()
         self.idle_timeout = 0.04  # faster decay when stream stops
+        # sub-pixel remainder not yet posted (px)
+        self.res_x = 0.0
+        self.res_y = 0.0
+        self.last_emit_t = 0.0
 
         # filtered angles (degrees) for angle path
         self.roll_f = 0.0
         self.pitch_f = 0.0
+        self.filt_roll = OneEuroFilter(beta=EURO_BETA_ANGLE)
+        self.filt_pitch = OneEuroFilter(beta=EURO_BETA_ANGLE)
+        self.kf_roll = KalmanAngle()
+        self.kf_pitch = KalmanAngle()
 
     def _clamp(self, x, lo, hi):
         return max(lo, min(hi, x))
 
+    def _move(self, dx, dy) -> bool:
+        """Post whole-pixel moves, carrying the sub-pixel remainder; False if nothing was posted or held."""
+        if dx == 0.0 and dy == 0.0:
+            # at rest: post what is still held for the next emit slot, drop the stale fraction
+            posted = self.flush()
+            self.res_x = self.res_y = 0.0
+            return posted
+        self.res_x += dx
+        self.res_y += dy
+        # several connections can feed the one cursor: hold the delta until the next emit slot
+        if time.monotonic() - self.last_emit_t < 1.0 / MOVE_EMIT_HZ:
+            return abs(self.res_x) >= 1.0 or abs(self.res_y) >= 1.0  # posted by a later move or flush()
+        return self.flush()
+
+    def flush(self) -> bool:
+        """Post the whole-pixel part of the residual now; False if there was none."""
+        pdx = int(self.res_x)
+        pdy = int(self.res_y)
+        if pdx == 0 and pdy == 0:
+            return False
+        self.res_x -= pdx
+        self.res_y -= pdy
+        self.last_emit_t = time.monotonic()
+        _input_q.put(("move", pdx, pdy))
+        return True
+
     # ----- vx/vy streaming path (version A) -----
-    def update_cursor(self, vx, vy, dt):
+    def _vel_delta(self, vx, vy, dt):
         now = time.monotonic()
         dt = self._clamp(dt, 0.005, 0.05)  # 20..200 Hz range
 
-        # low-pass filter incoming velocity to reduce jitter
-        a = self.alpha
-        self.vx_f = a * vx + (1 - a) * self.vx_f
-        self.vy_f = a * vy + (1 - a) * self.vy_f
-
-        # small deadband
-        if abs(self.vx_f) < CURSOR_DEAD_SPEED:
-            self.vx_f = 0.0
-        if abs(self.vy_f) < CURSOR_DEAD_SPEED:
-            self.vy_f = 0.0
-
-        # decay to zero if stream pauses (prevents drift)
-        if (now - self.last_input_t) > self.idle_timeout:
-            self.vx_f = 0.0
-            self.vy_f = 0.0
-        self.last_input_t = now
-
-        # translate normalized velocity to pixel delta
-        dx = self.vx_f * CURSOR_PIXELS_PER_SEC * dt
-        dy = -self.vy_f * CURSOR_PIXELS_PER_SEC * dt  # screen y is down
+        # restart the filters after a stream pause so stale state doesn't leak in
+        paused = (now - self.last_input_t) > self.idle_timeout
+        if paused:
+            self.filt_vx.reset()
+            self.filt_vy.reset()
 
-        # clamp per-frame delta to avoid sudden jumps on network hiccups
-        dx = self._clamp(dx, -24, 24)
-        dy = self._clamp(dy, -24, 24)
-
-        if dx == 0 and dy == 0:
-            return
-        try:
-            pyautogui.moveRel(dx, dy, duration=0)  # duration=0 is essential for low latency
-        except Exception as e:
-            print("moveRel error:", e)
+        # adaptive low-pass on incoming velocity to reduce jitter
+        dx, dy, self.vx_f, self.vy_f = _vel_step(
+            self.filt_vx(vx, dt), self.filt_vy(vy, dt), dt, paused)
+        self.last_input_t = now
+        return dx, dy
 
     # ----- angle path with single-axis dominance (version B) -----
-    def _axis_speed(self, angle_deg: float) -> float:
-        eff = max(0.0, abs(angle_deg) - DEAD_ZONE_DEG)
-        n = min(1.0, eff / SAT_ANGLE_DEG)
-        return V_MIN + (V_MAX - V_MIN) * (n * n)
-
-    def update_cursor_from_angles(self, roll_deg: float, pitch_deg: float, dt: float):
-        # low-pass filter the angles
-        a = ALPHA_ANGLE
-        self.roll_f  = a * roll_deg  + (1 - a) * self.roll_f
-        self.pitch_f = a * pitch_deg + (1 - a) * self.pitch_f
-
-        # Choose a single dominant axis (no diagonals)
-        vx = 0.0
-        vy = 0.0
-        ax = abs(self.roll_f)
-        ay = abs(self.pitch_f)
-
-        # both inside dead zone → stop
-        if ax <= DEAD_ZONE_DEG and ay <= DEAD_ZONE_DEG:
-            vx = 0.0
-            vy = 0.0
-        elif ax >= ay:
-            # horizontal dominates
-            if ax > DEAD_ZONE_DEG:
-                vx = (1.0 if self.roll_f > 0 else -1.0) * self._axis_speed(self.roll_f)
-                vy = 0.0
+    def _angle_delta(self, roll_deg: float, pitch_deg: float, dt: float,
+                     gyro_dps=None, accel_g=None):
+        if gyro_dps is not None and accel_g is not None:
+            # fuse raw sensors: roll turns about device +y, forward pitch about device -x
+            acc_roll, acc_pitch = accel_angles(accel_g)
+            self.roll_f  = self.kf_roll(gyro_dps[1], acc_roll, dt)
+            self.pitch_f = self.kf_pitch(-gyro_dps[0], acc_pitch, dt)
         else:
-            # vertical dominates; forward tilt (pitch > 0) moves cursor down (+y)
-            if ay > DEAD_ZONE_DEG:
-                vy = (1.0 if self.pitch_f > 0 else -1.0) * self._axis_speed(self.pitch_f)
-                vx = 0.0
-
-        # integrate to per-tick deltas and clamp
-        dx = vx * dt
-        dy = vy * dt
-
-        dx = self._clamp(dx, -MAX_STEP_PX, MAX_STEP_PX)
-        dy = self._clamp(dy, -MAX_STEP_PX, MAX_STEP_PX)
+            # adaptive low-pass on the angles
+            self.roll_f  = self.filt_roll(roll_deg, dt)
+            self.pitch_f = self.filt_pitch(pitch_deg, dt)
+        return _angle_step(self.roll_f, self.pitch_f, dt)
+
+    # ----- batched path: run every queued sample through the filters, post one move -----
+    def update_cursor_batch(self, vel_samples, angle_samples) -> bool:
+        dx = dy = 0.0
+        for vx, vy, dt in vel_samples:
+            sx, sy = self._vel_delta(vx, vy, dt)
+            dx += sx; dy += sy
+        for smp in angle_samples:
+            sx, sy = self._angle_delta(*smp)
+            dx += sx; dy += sy
+        return self._move(dx, dy)
 
-        if dx == 0.0 and dy == 0.0:
-            return
+    def click(self):
+        """Queue a left click on the input thread; errors there are only logged."""
+        _input_q.put(("click",))
 
-        try:
-            pyautogui.moveRel(dx, dy, duration=0)
-        except Exception as e:
-            print("moveRel error:", e)
+# Cursor moves and clicks are posted from one input thread, so a slow CGEventPost (or
+# pyautogui's PAUSE on the fallback path) never blocks the event loop. Moves that queue
+# up back-to-back are summed into a single event; order relative to clicks is kept.
+_input_q = queue.SimpleQueue()
 
-    def click(self):
-        try:
-            pyautogui.mouseDown()
-            pyautogui.mouseUp()
-        except Exception as e:
-            print("click error:", e)
+def _post_move(dx, dy):
+    try:
+        move_cursor_rel(dx, dy)
+    except Exception as e:
+        log.warning("moveRel error: %s", e)
+
+def _input_worker():
+    while True:
+        ops = [_input_q.get()]
+        while not _input_q.empty():
+            ops.append(_input_q.get_nowait())
+        dx = dy = 0
+        for op, *args in ops:
+            if op == "move":
+                dx += args[0]; dy += args[1]
+                continue
+            if dx or dy:
+                _post_move(dx, dy)
+                dx = dy = 0
+            if op == "click":
+                try:
+                    left_click()
+                except Exception as e:
+                    log.warning("click error: %s", e)
+        if dx or dy:
+            _post_move(dx, dy)
+
+threading.Thread(target=_input_worker, name="input", daemon=True).start()
 
 MOUSE = MouseController()
 
@@ -409,11 +637,11 @@ GEST_ENGINE = None
 def ensure_gesture_engine():
     """
     Lazy-initialize a singleton CameraGestureEngine and return it.
-    The engine invokes on_action(action: str) which we map to hotkeys.
+    The engine invokes on_action(action: str[, amount: int]) which we map to hotkeys.
     """
     global GEST_ENGINE
     if GEST_ENGINE is None:
-        def on_action(a: str):
+        def on_action(a: str, amount: int = 1):
             try:
                 if a == "zoom_in":
                     browser_zoom_in()
@@ -430,9 +658,9 @@ def ensure_gesture_engine():
                 elif a == "prev_tab":
                     browser_prev_tab()
                 elif a == "scroll_up":
-                    pyautogui.scroll(5)
+                    scroll_lines(5 * amount)
                 elif a == "scroll_down":
-                    pyautogui.scroll(-5)
+                    scroll_lines(-5 * amount)
                 elif a == "app_switcher_start":
                     # Hold ⌘ and press Tab to reveal the switcher
                     pyautogui.keyDown("command")
@@ -445,28 +673,26 @@ def ensure_gesture_engine():
                     # Release ⌘ to commit the selected app
                     pyautogui.keyUp("command")
             except Exception as e:
-                print("gesture action error:", a, e)
+                log.warning("gesture action error: %s %s", a, e)
         try:
             GEST_ENGINE = CameraGestureEngine(on_action)
         except Exception as e:
-            print("failed to init CameraGestureEngine:", e)
+            log.warning("failed to init CameraGestureEngine: %s", e)
             GEST_ENGINE = None
     return GEST_ENGINE
 
 # --- gesture handlers --------------------------------------------------------
 
-def handle_tilt_vector(payload: dict):
+def _tilt_vector_sample(payload: dict):
     vx = float(payload.get("vx", 0.0))
     vy = float(payload.get("vy", 0.0))
     dt = float(payload.get("dt", 0.016))
     # guard dt to keep motion stable
     if not (0.0005 <= dt <= 0.2):
         dt = 0.016
-    MOUSE.update_cursor(vx, vy, dt)
-    return "tilt_ok"
-
+    return vx, vy, dt
 
-def handle_tilt_angles(payload: dict):
+def _tilt_angles_sample(payload: dict):
     # read roll and pitch angles in DEGREES; dt in seconds
     # roll > 0 → right tilt; pitch > 0 → forward tilt (cursor down)
     roll = float(payload.get("roll_deg", payload.get("roll", 0.0)))
@@ -474,253 +700,517 @@ def handle_tilt_angles(payload: dict):
     dt = float(payload.get("dt", 1.0 / UPDATE_HZ))
     if not (0.0005 <= dt <= 0.2):
         dt = 1.0 / UPDATE_HZ
-    MOUSE.update_cursor_from_angles(roll, pitch, dt)
-    return "tilt_angles_ok"
+    # optional raw sensors for server-side fusion: gyro_dps [x,y,z] deg/s, accel_g [x,y,z] g
+    gyro = payload.get("gyro_dps")
+    accel = payload.get("accel_g")
+    if gyro is not None and accel is not None:
+        gyro = tuple(float(v) for v in gyro[:3])
+        accel = tuple(float(v) for v in accel[:3])
+    else:
+        gyro = accel = None
+    return roll, pitch, dt, gyro, accel
+
+def handle_tilt_batch(frames) -> str:
+    """Integrate a drained batch of (kind, payload) tilt frames into a single cursor move."""
+    vel, ang = [], []
+    for kind, payload in frames:
+        if kind == "tilt_vector":
+            vel.append(_tilt_vector_sample(payload))
+        else:
+            ang.append(_tilt_angles_sample(payload))
+    if not MOUSE.update_cursor_batch(vel, ang):
+        return "tilt_noop"  # sub-pixel: nothing posted
+    return "tilt_angles_ok" if ang else "tilt_ok"
+
+
+class TiltBatcher:
+    """
+    Per-connection tilt queue. ws_handler pushes frames; a task wakes only when
+    something is queued, drains everything per tick and acks once per batch.
+    The queue is bounded: after a network stall the oldest frames fall off, so the
+    cursor follows where the phone is now instead of replaying stale motion.
+    """
+    def __init__(self, outbox):
+        self.out = outbox
+        self.pending = deque(maxlen=TILT_MAX_BATCH)
+        self.dropped = 0  # frames pushed out of the full queue since the last ack
+        self.wake = asyncio.Event()
+        self.task = asyncio.create_task(self._run())
+
+    def push(self, kind: str, payload: dict):
+        if len(self.pending) == TILT_MAX_BATCH:
+            self.dropped += 1
+        self.pending.append((kind, payload))
+        self.wake.set()
+
+    def drain(self):
+        """Apply whatever is queued now and post it, so a following click lands after the moves."""
+        self.wake.clear()
+        if self.pending:
+            frames = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+            if dropped:
+                log.debug("tilt queue full, %d stale frames dropped", dropped)
+            try:
+                res = handle_tilt_batch(frames)
+            except Exception as e:
+                log.warning("tilt batch error: %s", e)
+                res = "tilt_failed"
+            self.out.put_tilt(res, len(frames), dropped)
+        # post a move the emit-rate cap held back
+        MOUSE.flush()
 
+    async def _run(self):
+        while True:
+            await self.wake.wait()
+            self.drain()
+            await asyncio.sleep(1.0 / TILT_TICK_HZ)
+            # ...even if the stream stopped during the tick
+            MOUSE.flush()
 
-_last_click_t = 0.0
+    def close(self):
+        self.task.cancel()
+
+
+CLICK_DEBOUNCE_NS = 100_000_000  # 100ms debounce against accidental double taps
+_last_click_ns = 0
 
 def handle_tap(_payload: dict):
-    global _last_click_t
-    now = time.monotonic()
-    if now - _last_click_t < 0.10:  # 100ms debounce
+    global _last_click_ns
+    now = time.monotonic_ns()
+    if now - _last_click_ns < CLICK_DEBOUNCE_NS:
         return "click_ignored"
-    _last_click_t = now
-    try:
-        pyautogui.mouseDown(); pyautogui.mouseUp()
-        return "click_ok"
-    except Exception as e:
-        print("click error:", e)
-        return "click_failed"
+    _last_click_ns = now
+    MOUSE.click()
+    return "click_ok"  # fire-and-forget: the click is queued, not yet posted
 
 # --- intent execution --------------------------------------------------------
 
-def apply_plan(plan: dict, slots: dict):
-    t = plan.get("type")
+# Each plan type maps to a handler(plan, slots) -> status string.
 
+def _do_open_app(plan: dict, slots: dict):
     # Open arbitrary macOS application by name or bundle id (from A)
-    if t in {"applescript_open_app", "open_app"}:
-        app_raw = (slots.get("app") or "").strip()
-        if not app_raw:
-            return "open_app_missing"
-        # Resolve alias → canonical name/bundle id
-        app_name = slot_app(app_raw) or app_raw
-        rc = open_mac_app(app_name)
+    app_raw = (slots.get("app") or "").strip()
+    if not app_raw:
+        return "open_app_missing"
+    # Resolve alias → canonical name/bundle id
+    app_name = slot_app(app_raw) or app_raw
+    rc = open_mac_app(app_name)
+    return "opened_app" if rc == 0 else "open_app_failed"
+
+def _do_gmail_compose(plan: dict, slots: dict):
+    open_gmail_compose(); return "opened_gmail"
+
+def _do_open_url(plan: dict, slots: dict):
+    raw = slots.get("url", "")
+    # Heuristic from A: if user said an app name (e.g., "safari", "keynote"), open the app instead of searching
+    app_guess = slot_app(raw)
+    if app_guess and raw and "." not in raw and "://" not in raw:
+        rc = open_mac_app(app_guess)
         return "opened_app" if rc == 0 else "open_app_failed"
 
-    if t == "applescript_gmail_compose":
-        open_gmail_compose(); return "opened_gmail"
-
-    if t == "applescript_open_url":
-        raw = slots.get("url", "")
-        # Heuristic from A: if user said an app name (e.g., "safari", "keynote"), open the app instead of searching
-        app_guess = slot_app(raw)
-        if app_guess and raw and "." not in raw and "://" not in raw:
-            rc = open_mac_app(app_guess)
-            return "opened_app" if rc == 0 else "open_app_failed"
-
-        url = slot_site(raw)  # alias → URL or normalized token
-        parsed = urlparse(url)
-        if not (parsed.scheme and parsed.netloc):
-            url = f"https://www.google.com/search?q={quote(raw.strip())}"
-        return open_url_in_active_browser(url)
-
-    if t == "applescript_keynote_start":
-        start_keynote_slideshow(); return "opened_presentation"
-
-    if plan.get("intent") == "type_text":
-        txt = (slots.get("text") or "").strip()
-        if txt:
-            focused_typing(txt); return "typed"
-        return "typed_empty"
-
-    if t == "hotkey":
-        pyautogui.hotkey(*plan["keys"]); return "hotkey"
-    if t == "key":
-        pyautogui.press(plan["key"]); return "key"
-    if t == "scroll":
-        pyautogui.scroll(plan.get("amount", -600)); return "scroll"
-
-    if t == "repeat_last":
-        global LAST_EXECUTED
-        if not LAST_EXECUTED: return "no_last_action"
-        if LAST_EXECUTED["intent"] in REPEAT_BLOCKLIST: return "repeat_blocked"
-        return apply_plan(LAST_EXECUTED["plan"], LAST_EXECUTED["slots"])
-
-    if t == "mailto_compose":
-        # Combined behavior: prefer Gmail web compose if any field present (A),
-        # but fall back to mailto URL (B) if Gmail compose fails.
-        to = (slots.get("to") or "").strip()
-        subject = (slots.get("subject") or "").strip()
-        body = (slots.get("body") or "").strip()
-        if to or subject or body:
-            # try Gmail web compose in active browser
-            res = gmail_compose_in_active_browser(to, subject, body, send=False)
-            if res != "gmail_compose_opened":
-                # fallback to mailto URL in active browser
-                url = mailto_url(to, subject, body)
-                open_url_in_active_browser(url)
-                time.sleep(1.0)
-                return "mailto_composed"
-            return res
-        # Otherwise, open Gmail compose window (no preset fields)
-        open_gmail_compose()
-        return "opened_gmail"
-
-    return "noop"
+    url = slot_site(raw)  # alias → URL or normalized token
+    parsed = urlparse(url)
+    if not (parsed.scheme and parsed.netloc):
+        url = "https://www.google.com/search?q=" + quote_plus(raw.strip())
+    return open_url_in_active_browser(url)
 
+def _do_keynote_start(plan: dict, slots: dict):
+    start_keynote_slideshow(); return "opened_presentation"
+
+def _do_type_text(plan: dict, slots: dict):
+    txt = (slots.get("text") or "").strip()
+    if txt:
+        focused_typing(txt); return "typed"
+    return "typed_empty"
+
+def _do_hotkey(plan: dict, slots: dict):
+    pyautogui.hotkey(*plan["keys"]); return "hotkey"
+
+def _do_key(plan: dict, slots: dict):
+    pyautogui.press(plan["key"]); return "key"
+
+def _do_scroll(plan: dict, slots: dict):
+    scroll_lines(plan.get("amount", -600)); return "scroll"
+
+def _do_repeat_last(plan: dict, slots: dict):
+    if not LAST_EXECUTED: return "no_last_action"
+    if LAST_EXECUTED["intent"] in REPEAT_BLOCKLIST: return "repeat_blocked"
+    return apply_plan(LAST_EXECUTED["plan"], LAST_EXECUTED["slots"])
+
+def _do_mailto_compose(plan: dict, slots: dict):
+    # Combined behavior: prefer Gmail web compose if any field present (A),
+    # but fall back to mailto URL (B) if Gmail compose fails.
+    to = (slots.get("to") or "").strip()
+    subject = (slots.get("subject") or "").strip()
+    body = (slots.get("body") or "").strip()
+    if to or subject or body:
+        # try Gmail web compose in active browser
+        res = gmail_compose_in_active_browser(to, subject, body, send=False)
+        if res != "gmail_compose_opened":
+            # fallback to mailto URL in active browser
+            url = mailto_url(to, subject, body)
+            open_url_in_active_browser(url)
+            return "mailto_composed"
+        return res
+    # Otherwise, open Gmail compose window (no preset fields)
+    open_gmail_compose()
+    return "opened_gmail"
+
+PLAN_HANDLERS = {
+    "applescript_open_app": _do_open_app,
+    "open_app": _do_open_app,
+    "applescript_gmail_compose": _do_gmail_compose,
+    "applescript_open_url": _do_open_url,
+    "applescript_keynote_start": _do_keynote_start,
+    "type_text": _do_type_text,
+    "hotkey": _do_hotkey,
+    "key": _do_key,
+    "scroll": _do_scroll,
+    "repeat_last": _do_repeat_last,
+    "mailto_compose": _do_mailto_compose,
+}
+
+def apply_plan(plan: dict, slots: dict):
+    if plan.get("intent") == "type_text":  # typed text regardless of the plan's type
+        return _do_type_text(plan, slots)
+    fn = PLAN_HANDLERS.get(plan.get("type"))
+    return fn(plan, slots) if fn else "noop"
+
+
+# Server-level intents from A (not in keymap.json): handler(slots) -> status
+
+def _intent_set_browser(slots: dict):
+    browser = (slots.get("browser") or "").strip()
+    set_preferred_browser(browser)
+    return "browser_set"
+
+def _intent_compose_email(slots: dict):
+    return gmail_compose_in_active_browser(
+        slots.get("to", ""),
+        slots.get("subject", ""),
+        slots.get("body", ""),
+        send=False
+    )
+
+def _intent_send_email(slots: dict):
+    # one-shot send if fields provided; else send current compose
+    to = slots.get("to"); subject = slots.get("subject"); body = slots.get("body")
+    if any([to, subject, body]):
+        return gmail_compose_in_active_browser(to or "", subject or "", body or "", send=True)
+    try:
+        pyautogui.hotkey("command", "enter")
+        return "gmail_sent"
+    except Exception as e:
+        log.warning("gmail send hotkey error: %s", e)
+        return "gmail_send_failed"
+
+SERVER_INTENTS = {
+    "set_browser": _intent_set_browser,
+    "compose_email": _intent_compose_email,
+    "send_email": _intent_send_email,
+}
 
 def execute_intent(intent: str, slots: dict):
-    # Server-level intents from A
-    if intent == "set_browser":
-        browser = (slots.get("browser") or "").strip()
-        set_preferred_browser(browser)
-        return "browser_set"
-
-    if intent == "compose_email":
-        return gmail_compose_in_active_browser(
-            slots.get("to", ""),
-            slots.get("subject", ""),
-            slots.get("body", ""),
-            send=False
-        )
-
-    if intent == "send_email":
-        # one-shot send if fields provided; else send current compose
-        to = slots.get("to"); subject = slots.get("subject"); body = slots.get("body")
-        if any([to, subject, body]):
-            return gmail_compose_in_active_browser(to or "", subject or "", body or "", send=True)
-        try:
-            pyautogui.hotkey("command", "enter")
-            return "gmail_sent"
-        except Exception as e:
-            print("gmail send hotkey error:", e)
-            return "gmail_send_failed"
+    fn = SERVER_INTENTS.get(intent)
+    if fn is not None:
+        return fn(slots)
 
     global LAST_EXECUTED
     plan = KEYMAP.get(intent)
     if not plan: return "unknown_intent"
-    plan = {**plan, "intent": intent}
     status = apply_plan(plan, slots)
-    if intent not in REPEAT_BLOCKLIST and status not in {"noop","unknown_intent"}:
+    # never record repeat_last itself, or the next repeat would recurse forever
+    if (intent not in REPEAT_BLOCKLIST and plan.get("type") != "repeat_last"
+            and status not in {"noop","unknown_intent"}):
         LAST_EXECUTED = {"intent": intent, "plan": plan, "slots": slots}
     return status
 
 # --- websocket server --------------------------------------------------------
 
+# --- command worker ---------------------------------------------------------
+# Commands and key-driving gestures block (pyautogui PAUSE, AppleScript, sleeps), so they
+# run on one worker thread: in order, and without stalling the event loop / cursor stream.
+EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="cmd")
+
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(EXECUTOR, fn, *args)
+
+async def command_reply(text: str) -> dict:
+    # local route first
+    intent, slots, how = local_route(text)
+    if intent:
+        res = await run_blocking(execute_intent, intent, slots)
+        return {"ok": True, "result": res, "via": how}
+    # LLM fallback
+    plan = await ollama_route(text) or {}
+    vr = validate_and_normalize_plan(plan)
+    err = None
+    action = None
+    slots = {}
+
+    # Accept (action, slots) OR ((action, slots), err) OR {"action":..., "slots":...}
+    if isinstance(vr, tuple):
+        if len(vr) == 2 and isinstance(vr[0], str):
+            action, slots = vr
+        elif len(vr) == 2 and isinstance(vr[0], tuple):
+            (action, slots), err = vr
+    elif isinstance(vr, dict):
+        action = vr.get("action") or vr.get("intent")
+        slots = vr.get("slots", {})
+
+    if err or not action:
+        return {"ok": False, "error": f"nlu_failed:{err or 'bad_plan'}"}
+
+    res = await run_blocking(execute_intent, action, slots)
+    return {"ok": True, "result": res, "via": "llm"}
+
+def handle_swipe(data: dict) -> str:
+    # Swipe mapping (from phone or camera):
+    # right → history forward
+    # left  → history back
+    # up    → scroll up
+    # down  → scroll down
+    direction = (data.get("direction") or "").lower()
+    if not direction:
+        try:
+            dx = float(data.get("dx", 0.0))
+            dy = float(data.get("dy", 0.0))
+            if abs(dx) >= abs(dy):
+                direction = "right" if dx > 0 else "left"
+            else:
+                direction = "down" if dy > 0 else "up"
+        except Exception:
+            direction = ""
+    if direction == "right":
+        browser_history_forward(); return "history_forward"
+    elif direction == "left":
+        browser_history_back(); return "history_back"
+    elif direction == "up":
+        scroll_up(); return "scroll_up"
+    elif direction == "down":
+        scroll_down(); return "scroll_down"
+    else:
+        return "gesture_ignored"
+
+def handle_gestures_toggle(data: dict) -> str:
+    enabled = bool(data.get("enabled"))
+    eng = ensure_gesture_engine()
+    if not eng:
+        return "gestures_unavailable"
+    else:
+        if enabled:
+            eng.start(); return "gestures_on"
+        else:
+            eng.stop(); return "gestures_off"
+
+async def blocking_reply(fn, payload) -> dict:
+    return {"ok": True, "result": await run_blocking(fn, payload)}
+
+async def command_worker(q: asyncio.Queue, out):
+    """Run queued (coroutine fn, *args) jobs one at a time and queue their replies."""
+    while True:
+        fn, *args = await q.get()
+        try:
+            out.put(await fn(*args))
+        except Exception as e:
+            log.warning("command error: %s", e)
+            out.put(ERR_COMMAND_FAILED)
+
+@lru_cache(maxsize=256)
+def ack(result: str, n=None, dropped=0) -> bytes:
+    """Encoded {"ok": true, "result": ...} reply; the few distinct acks are encoded once."""
+    obj = {"ok": True, "result": result}
+    if n is not None:
+        obj["n"] = n
+    if dropped:
+        obj["dropped"] = dropped  # lets the client see it is sending faster than we drain
+    return orjson.dumps(obj)
+
+# fixed replies, encoded once at import
+for _res in ("tilt_ok", "tilt_angles_ok", "tilt_noop", "click_ok", "click_ignored",
+             "motion_started", "gesture_ignored"):
+    ack(_res)
+HELLO = orjson.dumps({"ok": True, "type": "hello", "from": "server"})
+HELLO_ACK = orjson.dumps({"ok": True, "type": "hello_ack"})
+ERR_BAD_JSON = orjson.dumps({"ok": False, "error": "bad_json"})
+ERR_UNKNOWN_TYPE = orjson.dumps({"ok": False, "error": "unknown_type"})
+ERR_COMMAND_FAILED = orjson.dumps({"ok": False, "error": "command_failed"})
+
+OUTBOX_MAX = 256       # queued replies per connection before the oldest is dropped
+OUTBOX_FLUSH_S = 0.016 # after a send, wait this long so following replies share a frame
+_TILT_SLOT = object()  # outbox placeholder for the merged tilt ack
+
+class Outbox:
+    """
+    Per-connection reply queue with a single writer task. Whatever is queued when it
+    wakes goes out as one text frame, one JSON object per line.
+    """
+    def __init__(self, websocket):
+        self.ws = websocket
+        self.q = asyncio.Queue(maxsize=OUTBOX_MAX)
+        self.tilt = None  # (last result, frames, dropped) of tilt acks not yet sent
+        self.task = asyncio.create_task(self._run())
+
+    def _enqueue(self, item):
+        if self.q.full():
+            # drop the oldest; replies are informational
+            if self.q.get_nowait() is _TILT_SLOT:
+                self.tilt = None
+        self.q.put_nowait(item)
+
+    def put(self, obj):
+        """Queue a reply: a dict, or bytes already encoded (see ack)."""
+        self._enqueue(obj if isinstance(obj, bytes) else orjson.dumps(obj))
+
+    def put_tilt(self, result: str, n: int, dropped: int):
+        """Tilt acks that pile up while a send is in flight go out as one, with summed counts."""
+        if self.tilt is None:
+            self.tilt = (result, n, dropped)
+            self._enqueue(_TILT_SLOT)
+        else:
+            _, n0, d0 = self.tilt
+            self.tilt = (result, n0 + n, d0 + dropped)
+
+    async def _run(self):
+        while True:
+            out = [await self.q.get()]
+            while not self.q.empty():
+                out.append(self.q.get_nowait())
+            if self.tilt is not None:
+                out = [ack(*self.tilt) if b is _TILT_SLOT else b for b in out]
+                self.tilt = None
+            try:
+                # orjson gives bytes; text=True still sends a text frame, without a decode round-trip
+                await self.ws.send(b"\n".join(out), text=True)
+            except ConnectionClosed:
+                return
+            await asyncio.sleep(OUTBOX_FLUSH_S)
+
+    def close(self):
+        self.task.cancel()
+
+class Connection:
+    """Per-client state: reply outbox, tilt batcher and the ordered command worker."""
+    def __init__(self, websocket):
+        self.out = Outbox(websocket)
+        self.tilt = TiltBatcher(self.out)
+        self.cmds = asyncio.Queue()
+        self.worker = asyncio.create_task(command_worker(self.cmds, self.out))
+
+    def close(self):
+        self.tilt.close()
+        self.worker.cancel()
+        self.out.close()
+
+# --- message dispatch --------------------------------------------------------
+
+TILT_KINDS = {"tilt_vector", "tilt_angles"}  # drained per tick by the TiltBatcher
+
+# blocking gestures: run in order on the command worker
+QUEUED_GESTURES = {
+    "swipe": handle_swipe,
+    "gestures_toggle": handle_gestures_toggle,
+}
+
+# cheap gestures: handled inline, payload -> result
+GESTURE_HANDLERS = {
+    "tap": handle_tap,
+    "motion_started": lambda _: "motion_started",
+}
+
+def on_hello(conn, data):
+    conn.out.put(HELLO_ACK)
+
+def on_command(conn, data):
+    # run in order on the worker so the read loop keeps feeding the cursor
+    conn.cmds.put_nowait((command_reply, data.get("text","")))
+
+def on_gesture(conn, data):
+    kind = data.get("kind")
+    if kind in TILT_KINDS:
+        conn.tilt.push(kind, data)  # acked by the batcher once per drained tick
+        return
+    h = QUEUED_GESTURES.get(kind)
+    if h is not None:
+        conn.cmds.put_nowait((blocking_reply, h, data))
+        return
+    if kind == "tap":
+        conn.tilt.drain()  # frames that arrived before the tap move the cursor first
+    h = GESTURE_HANDLERS.get(kind)
+    conn.out.put(ack(h(data) if h else "gesture_ignored"))
+
+TYPE_HANDLERS = {
+    "hello": on_hello,
+    "command": on_command,
+    "gesture": on_gesture,
+}
+
 async def ws_handler(websocket):
-    print(f"[{now()}] 🚪 client connected: {websocket.remote_address}")
+    log.info("🚪 client connected: %s", websocket.remote_address)
+    # tiny gesture frames: send immediately instead of waiting on Nagle/delayed-ACK
+    try:
+        sock = websocket.transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except Exception as e:
+        log.warning("TCP_NODELAY error: %s", e)
     # send hello so iPhone can confirm
-    await websocket.send(json.dumps({"ok": True, "type": "hello", "from": "server"}))
+    conn = Connection(websocket)
+    conn.out.put(HELLO)
     try:
-        async for msg in websocket:
-            print(f"[{now()}] ⇦ rx: {msg[:200]}")
+        while True:
+            # raw bytes for text and binary frames alike: orjson parses (and UTF-8 checks) them itself
             try:
-                data = json.loads(msg)
-            except:
-                await websocket.send(json.dumps({"ok": False, "error": "bad_json"}))
+                msg = await websocket.recv(decode=False)
+            except ConnectionClosed:
+                break
+            try:
+                data = orjson.loads(msg)
+            except orjson.JSONDecodeError:
+                log.info("⇦ rx (bad json): %s", msg[:200].decode(errors="replace"))
+                conn.out.put(ERR_BAD_JSON)
                 continue
 
             typ = data.get("type")
-            if typ == "hello":
-                await websocket.send(json.dumps({"ok": True, "type": "hello_ack"}))
-                continue
-
-            if typ == "command":
-                text = data.get("text","")
-                # local route first
-                intent, slots, how = local_route(text)
-                if intent:
-                    res = execute_intent(intent, slots)
-                    await websocket.send(json.dumps({"ok": True, "result": res, "via": how}))
-                    continue
-                # LLM fallback
-                plan = ollama_route(text) or {}
-                vr = validate_and_normalize_plan(plan)
-                err = None
-                action = None
-                slots = {}
-
-                # Accept (action, slots) OR ((action, slots), err) OR {"action":..., "slots":...}
-                if isinstance(vr, tuple):
-                    if len(vr) == 2 and isinstance(vr[0], str):
-                        action, slots = vr
-                    elif len(vr) == 2 and isinstance(vr[0], tuple):
-                        (action, slots), err = vr
-                elif isinstance(vr, dict):
-                    action = vr.get("action") or vr.get("intent")
-                    slots = vr.get("slots", {})
-
-                if err or not action:
-                    await websocket.send(json.dumps({"ok": False, "error": f"nlu_failed:{err or 'bad_plan'}"}))
-                    continue
-
-                res = execute_intent(action, slots)
-                await websocket.send(json.dumps({"ok": True, "result": res, "via": "llm"}))
-
-            elif typ == "gesture":
-                kind = data.get("kind")
-                if kind == "tilt_vector":
-                    res = handle_tilt_vector(data)
-                elif kind == "tilt_angles":
-                    res = handle_tilt_angles(data)
-                elif kind == "tap":
-                    res = handle_tap(data)
-                elif kind == "swipe":
-                    # Swipe mapping (from phone or camera):
-                    # right → history forward
-                    # left  → history back
-                    # up    → scroll up
-                    # down  → scroll down
-                    direction = (data.get("direction") or "").lower()
-                    if not direction:
-                        try:
-                            dx = float(data.get("dx", 0.0))
-                            dy = float(data.get("dy", 0.0))
-                            if abs(dx) >= abs(dy):
-                                direction = "right" if dx > 0 else "left"
-                            else:
-                                direction = "down" if dy > 0 else "up"
-                        except Exception:
-                            direction = ""
-                    if direction == "right":
-                        browser_history_forward(); res = "history_forward"
-                    elif direction == "left":
-                        browser_history_back(); res = "history_back"
-                    elif direction == "up":
-                        scroll_up(); res = "scroll_up"
-                    elif direction == "down":
-                        scroll_down(); res = "scroll_down"
-                    else:
-                        res = "gesture_ignored"
-                elif kind == "gestures_toggle":
-                    enabled = bool(data.get("enabled"))
-                    eng = ensure_gesture_engine()
-                    if not eng:
-                        res = "gestures_unavailable"
-                    else:
-                        if enabled:
-                            eng.start(); res = "gestures_on"
-                        else:
-                            eng.stop(); res = "gestures_off"
-                elif kind == "motion_started":
-                    res = "motion_started"
-                else:
-                    res = "gesture_ignored"
-                await websocket.send(json.dumps({"ok": True, "result": res}))
+            # gesture frames arrive at 60+ Hz: only log them at debug level
+            level = logging.DEBUG if typ == "gesture" else logging.INFO
+            if log.isEnabledFor(level):
+                log.log(level, "⇦ rx: %s", msg[:200].decode(errors="replace"))
+            h = TYPE_HANDLERS.get(typ)
+            if h is None:
+                conn.out.put(ERR_UNKNOWN_TYPE)
             else:
-                await websocket.send(json.dumps({"ok": False, "error": "unknown_type"}))
+                h(conn, data)
     finally:
-        print(f"[{now()}] 📴 client disconnected: {websocket.remote_address}")
+        conn.close()
+        log.info("📴 client disconnected: %s", websocket.remote_address)
+
 
+MAX_FRAME_BYTES = 4096  # gesture/command frames are tiny; bigger frames close the connection (1009)
 
 async def main():
-    print("Server listening on ws://0.0.0.0:8765")
-    async with websockets.serve(ws_handler, "0.0.0.0", 8765, ping_interval=None):
-        await asyncio.Future()
+    log.info("Server listening on ws://0.0.0.0:8765 (%s)", type(asyncio.get_running_loop()).__module__)
+    # warm the AppleScript helper in the background; commands queue behind it on EXECUTOR
+    asyncio.get_running_loop().run_in_executor(EXECUTOR, precompile_applescripts, *APPLESCRIPTS.values())
+    async with serve(ws_handler, "0.0.0.0", 8765, ping_interval=None, compression=None,
+                                max_size=MAX_FRAME_BYTES, max_queue=32, write_limit=2**20):
+        try:
+            await asyncio.Future()
+        finally:
+            await close_ollama()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(message)s", datefmt="%H:%M:%S")
     try:
-        import asyncio; asyncio.run(main())
+        import uvloop  # optional: faster event loop (macOS/Linux only)
+    except ImportError:
+        uvloop = None
+    try:
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         sys.exit(0)
\ No newline at end of file